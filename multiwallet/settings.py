@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,7 +41,6 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'widget_tweaks',
     'django.contrib.humanize',
-    'django_ratelimit',
     'wallet',
 ]
 
@@ -52,7 +52,6 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django_ratelimit.middleware.RatelimitMiddleware',
      
 ]
 
@@ -84,6 +83,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # File-backed so the concurrency tests can use real connections per thread
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -161,7 +162,49 @@ CACHES = {
 }
 
 
-RATELIMIT_VIEW = 'wallet.views.rate_limited_view'
+# Tests run without a Redis server: use process-local memory instead
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']  # fast test user creation
+
+# Cache holding the per-wallet transaction velocity counters
+FRAUD_VELOCITY_CACHE = 'default'
+
+# Cache shared by all workers for the current FX rate matrix
+FX_RATE_CACHE = 'default'
+
+# Cache holding each user's rendered dashboard panels and their version keys
+DASHBOARD_CACHE = 'default'
+
+# Cache holding the shared rate limit counters; workers lease from them in batches
+# (see wallet.throttle.POLICIES for the limits themselves)
+RATELIMIT_CACHE = 'default'
+# Switch every wallet.throttle limit off (e.g. for load tests); policies stay declared
+RATELIMIT_ENABLE = True
+
+# Cache for the capped match counts on the manager's transaction search
+SEARCH_CACHE = 'default'
+
+# Cache for rendered TOTP QR codes and the codes already used (replay protection)
+OTP_CACHE = 'default'
+
+# Buffer login/logout history and write it in batches from a background thread
+# (wallet.loginlog); unflushed events are written at interpreter exit. Tests write
+# each row straight away, inside the test's transaction.
+LOGIN_HISTORY_BUFFERED = 'test' not in sys.argv
+
+# Serve the async read views (dashboard, ledger, manager dashboard, login history).
+# multiwallet/asgi.py turns this on; under WSGI the sync views are faster.
+ASYNC_READ_VIEWS = os.environ.get('MULTIWALLET_ASYNC_VIEWS') == '1'
+
+# Live pending-queue events (served under ASGI, e.g. `uvicorn multiwallet.asgi:application`).
+# None keeps them in-process; set a Redis URL to share them between worker processes.
+PENDING_EVENTS_REDIS_URL = None
+
 
 
 
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Currency, Wallet, Transaction, Ledger, FraudLog, LoginHistory
+from .models import CustomUser, Currency, Wallet, Transaction, Ledger, LedgerCheckpoint, FraudLog, LoginHistory, EmailOutbox, FxRate
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -14,6 +14,7 @@ admin.site.register(Currency)
 admin.site.register(Wallet)
 admin.site.register(Transaction)
 admin.site.register(Ledger)
+admin.site.register(LedgerCheckpoint)
 admin.site.register(FraudLog)
 
 
@@ -22,3 +23,17 @@ class LoginHistoryAdmin(admin.ModelAdmin):
     list_display = ('user', 'ip_address', 'timestamp')
     search_fields = ('user__username', 'ip_address')
     list_filter = ('login_time', 'logout_time', 'user')
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject')
+
+
+@admin.register(FxRate)
+class FxRateAdmin(admin.ModelAdmin):
+    list_display = ('base', 'quote', 'rate', 'effective_at')
+    list_filter = ('base', 'quote')
+    date_hierarchy = 'effective_at'
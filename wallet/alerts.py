@@ -0,0 +1,56 @@
+from datetime import timedelta
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from .models import FraudLog
+from .fraud import ADMIN_EMAIL
+from . import outbox
+
+ALERT_WINDOW_MINUTES = 5
+DIGEST_MAX_LINES = 500
+
+
+def _window(ts):
+    return int(ts.timestamp()) // (ALERT_WINDOW_MINUTES * 60)
+
+
+def notify_user(tx, hit):
+    """Queue the user's fraud alert, at most one per wallet per alert window."""
+    key = f"fraud:{tx.wallet_id}:{_window(timezone.now())}"
+    return outbox.enqueue(tx.wallet.user.email, hit.rule.subject, hit.rule.message(tx, hit.log), dedupe_key=key)
+
+
+def send_admin_digest(now=None):
+    """
+    Queue one email to ADMIN_EMAIL covering every fraud log not yet reported.
+
+    Nothing is sent until the oldest pending log is a full window old, so a
+    burst of hits becomes one email per window instead of one per hit.
+    Returns the number of logs included.
+    """
+    now = now or timezone.now()
+    pending = FraudLog.objects.filter(digested_at__isnull=True)
+    oldest = pending.order_by('id').values_list('flagged_at', flat=True).first()
+    if oldest is None or oldest > now - timedelta(minutes=ALERT_WINDOW_MINUTES):
+        return 0
+
+    with db_transaction.atomic():
+        # Claim first so two workers can't report the same logs
+        claimed = pending.filter(flagged_at__lte=now).update(digested_at=now)
+        if not claimed:
+            return 0
+        logs = (FraudLog.objects.filter(digested_at=now)
+                .select_related('user', 'transaction')
+                .order_by('flagged_at')[:DIGEST_MAX_LINES])
+        lines = [
+            f"- {log.flagged_at:%Y-%m-%d %H:%M} {log.user.username} | Tx #{log.transaction_id} "
+            f"{log.transaction.tx_type} ₹{log.transaction.amount} | {log.reason}"
+            for log in logs
+        ]
+        if claimed > len(lines):
+            lines.append(f"... and {claimed - len(lines)} more.")
+        outbox.enqueue(
+            ADMIN_EMAIL,
+            f"🚩 Fraud digest: {claimed} flagged transaction(s)",
+            "Fraud alerts raised since the last digest:\n\n" + "\n".join(lines),
+        )
+    return claimed
@@ -0,0 +1,83 @@
+from itertools import product
+import numpy as np
+from django.core.management.base import CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Transaction
+from . import fraud
+
+CHUNK_SIZE = 50000
+
+
+def load_batch(since=None, until=None, chunk_size=CHUNK_SIZE):
+    """
+    Read transactions into one fraud.TransactionBatch, ``chunk_size`` rows at a time.
+
+    Each chunk is converted to NumPy columns as soon as it is read, so only
+    one chunk of Python tuples is alive at once; tx_type and status arrive
+    as int8 codes from the database. Returns None if the range is empty.
+    """
+    qs = Transaction.objects.all()
+    if since:
+        qs = qs.filter(created_at__gte=since)
+    if until:
+        qs = qs.filter(created_at__lt=until)
+    rows = fraud.TransactionBatch.rows(qs).iterator(chunk_size=chunk_size)
+
+    chunks = []
+    buffer = []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) == chunk_size:
+            chunks.append(fraud.TransactionBatch(buffer))
+            buffer = []
+    if buffer:
+        chunks.append(fraud.TransactionBatch(buffer))
+    if not chunks:
+        return None
+    return fraud.TransactionBatch.concat(chunks)
+
+
+def run_grid(batch, grid):
+    """
+    Flag counts per registered rule for every combination of candidate parameters.
+
+    ``grid`` maps fraud.PARAMS names to lists of values; parameters left out
+    keep their live values. The rules in fraud.RULES are evaluated exactly as
+    in production, with ``batch.params`` set to each combination. Window
+    counts are computed once per window and 24h withdrawal sums once, so each
+    extra grid point only costs the rules' vectorised comparisons.
+    """
+    unknown = set(grid) - set(fraud.PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown fraud parameter(s): {', '.join(sorted(unknown))}")
+    windows = grid.get('window_minutes', [fraud.PARAMS['window_minutes']])
+    batch.compute_context()  # fills withdrawn_24h, which no parameter changes
+    counts_by_window = {
+        minutes: fraud.window_counts(batch.wallet_ids, batch.created_at, minutes * 60) if len(batch) else batch.window_counts
+        for minutes in windows
+    }
+
+    results = []
+    for values in product(*grid.values()):
+        batch.params = {**fraud.PARAMS, **dict(zip(grid, values))}
+        batch.window_counts = counts_by_window[batch.params['window_minutes']]
+        row = dict(zip(grid, values))
+        flagged = np.zeros(len(batch), dtype=bool)
+        for r in fraud.RULES:
+            mask = r.evaluate(batch)
+            row[r.name] = int(mask.sum())
+            flagged |= mask
+        row['flagged'] = int(flagged.sum())
+        results.append(row)
+    return results
+
+
+def parse_when(value):
+    """ISO datetime option for the fraud commands (naive values are in the current timezone)."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise CommandError(f"Invalid datetime: {value}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
@@ -0,0 +1,171 @@
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+from django.db import connection as db_connection, transaction as db_transaction
+from django.utils import timezone
+from .models import Transaction, Ledger, Wallet
+from .emails import transaction_email
+from . import alerts, checkpoints, events, fraud, limits, outbox, panels, summary
+from .posting import _legs
+
+BATCH_SIZE = 1000
+
+BulkResult = namedtuple('BulkResult', ['processed', 'failed'])  # [tx id], {tx id: reason}
+
+
+def approve(tx_ids, manager, batch_size=BATCH_SIZE):
+    """
+    Approve many pending transactions, ``batch_size`` per DB transaction.
+
+    Each batch locks its transactions and then every wallet they touch in
+    id order, works out the new balances in memory, and writes them back
+    with one bulk UPDATE, one Ledger INSERT and one outbox INSERT.
+    Transactions that would overdraw a wallet stay pending.
+    """
+    return _in_batches(_approve_batch, tx_ids, manager, batch_size)
+
+
+def reject(tx_ids, manager, batch_size=BATCH_SIZE):
+    """Reject many pending transactions and release their holds, ``batch_size`` per DB transaction."""
+    return _in_batches(_reject_batch, tx_ids, manager, batch_size)
+
+
+def _in_batches(process, tx_ids, manager, batch_size):
+    ids = sorted(set(tx_ids))
+    processed, failed = [], {}
+    for start in range(0, len(ids), batch_size):
+        done, errors = process(ids[start:start + batch_size], manager)
+        processed.extend(done)
+        failed.update(errors)
+    return BulkResult(processed, failed)
+
+
+def _claim(ids, manager, status):
+    # Lock the rows in id order so overlapping batches queue instead of deadlocking.
+    # SQLite has no row locks; there the UPDATE takes the database write lock first.
+    now = timezone.now()
+    pending = Transaction.objects.filter(pk__in=ids, status='PENDING', posted_at__isnull=True)
+    if db_connection.features.has_select_for_update:
+        list(pending.select_for_update().order_by('id').values_list('id', flat=True))
+    changes = {'status': status, 'approved_by': manager, 'processed_at': now}
+    if status == 'APPROVED':
+        changes['posted_at'] = now
+    if not pending.update(**changes):
+        return []
+    return list(
+        Transaction.objects.filter(pk__in=ids, status=status, approved_by=manager, processed_at=now)
+        .select_related('wallet__user', 'target_wallet')
+        .order_by('id')
+    )
+
+
+def _lock_wallets(wallet_ids):
+    wallets = Wallet.objects.filter(pk__in=wallet_ids).order_by('id')
+    if db_connection.features.has_select_for_update:
+        wallets = wallets.select_for_update()
+    return {wallet.pk: wallet for wallet in wallets}
+
+
+def _release(wallet, amount):
+    # Same rule as Wallet.unfreeze(); returns the amount the hold actually gave up
+    released = min(wallet.frozen_amount, amount)
+    wallet.is_frozen = wallet.frozen_amount > amount
+    wallet.frozen_amount -= released
+    return released
+
+
+def _approve_batch(ids, manager):
+    with db_transaction.atomic():
+        txs = _claim(ids, manager, 'APPROVED')
+        if not txs:
+            return [], {}
+        wallets = _lock_wallets({leg[0].pk for tx in txs for leg in _legs(tx)})
+
+        done, failed, entries = [], {}, []
+        balance_change = defaultdict(Decimal)
+        released = defaultdict(Decimal)
+        for tx in txs:
+            legs = [(wallets[wallet.pk], entry_type, Decimal(amount)) for wallet, entry_type, amount in _legs(tx)]
+            before = {wallet.pk: (wallet.balance, wallet.frozen_amount, wallet.is_frozen, wallet.entries_since_checkpoint)
+                      for wallet, _, _ in legs}
+            tx_entries, tx_released = [], []
+            for wallet, entry_type, amount in legs:
+                if entry_type == 'debit' and wallet.balance < amount:
+                    failed[tx.pk] = f"Insufficient balance in wallet {wallet.account_number}."
+                    break
+                wallet.balance += amount if entry_type == 'credit' else -amount
+                tx_released.append((wallet.currency_id, _release(wallet, amount)))
+                wallet.entries_since_checkpoint += 1
+                tx_entries.append(Ledger(transaction=tx, wallet=wallet, entry_type=entry_type,
+                                         amount=amount, balance_after=wallet.balance))
+            if tx.pk in failed:
+                for wallet, _, _ in legs:
+                    wallet.balance, wallet.frozen_amount, wallet.is_frozen, wallet.entries_since_checkpoint = before[wallet.pk]
+                continue
+            done.append(tx)
+            entries.extend(tx_entries)
+            for wallet, entry_type, amount in legs:
+                balance_change[wallet.currency_id] += amount if entry_type == 'credit' else -amount
+            for currency_id, amount in tx_released:
+                released[currency_id] += amount
+
+        if failed:
+            Transaction.objects.filter(pk__in=failed).update(
+                status='PENDING', approved_by=None, processed_at=None, posted_at=None,
+            )
+        if not done:
+            return [], failed
+
+        touched = {entry.wallet_id: wallets[entry.wallet_id] for entry in entries}
+        Wallet.objects.bulk_update(list(touched.values()), ['balance', 'frozen_amount', 'is_frozen', 'entries_since_checkpoint'])
+        Ledger.objects.bulk_create(entries)
+
+        withdrawn = defaultdict(Decimal)
+        for tx in done:
+            if tx.tx_type == 'WITHDRAW':
+                withdrawn[tx.wallet_id] += tx.amount
+        limits.record_withdrawals(withdrawn, done[0].posted_at)
+        checkpoints.maybe_checkpoint_many(list(touched.values()))
+
+        for currency_id, amount in balance_change.items():
+            summary.bump('balance', currency_id, amount=amount)
+        for currency_id, amount in released.items():
+            summary.bump('frozen', currency_id, amount=-amount)
+        summary.bump('pending', count=-len(done))
+        panels.touch(*{wallet.user_id for wallet in touched.values()})
+
+        by_id = {tx.pk: tx for tx in done}
+        for hit in fraud.check_transactions(done):
+            if hit.rule.subject:
+                alerts.notify_user(by_id[hit.log.transaction_id], hit)
+        outbox.enqueue_many([transaction_email(tx, tx.wallet, approved=True) for tx in done],
+                            from_email='noreply@walletapp.com')
+        events.transactions_processed('APPROVED', [tx.pk for tx in done])
+    return [tx.pk for tx in done], failed
+
+
+def _reject_batch(ids, manager):
+    with db_transaction.atomic():
+        txs = _claim(ids, manager, 'REJECTED')
+        if not txs:
+            return [], {}
+
+        holds = []
+        for tx in txs:
+            holds.append((tx.wallet_id, tx.amount))
+            if tx.tx_type == 'TRANSFER' and tx.target_wallet_id:
+                holds.append((tx.target_wallet_id, tx.converted_amount or tx.amount))
+        wallets = _lock_wallets({wallet_id for wallet_id, _ in holds})
+
+        released = defaultdict(Decimal)
+        for wallet_id, amount in holds:
+            released[wallets[wallet_id].currency_id] += _release(wallets[wallet_id], amount)
+        Wallet.objects.bulk_update(list(wallets.values()), ['frozen_amount', 'is_frozen'])
+
+        for currency_id, amount in released.items():
+            summary.bump('frozen', currency_id, amount=-amount)
+        summary.bump('pending', count=-len(txs))
+        panels.touch(*{wallet.user_id for wallet in wallets.values()})
+        outbox.enqueue_many([transaction_email(tx, tx.wallet, approved=False) for tx in txs],
+                            from_email='noreply@walletapp.com')
+        events.transactions_processed('REJECTED', [tx.pk for tx in txs])
+    return [tx.pk for tx in txs], {}
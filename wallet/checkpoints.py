@@ -0,0 +1,102 @@
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+from .models import Ledger, LedgerCheckpoint, Wallet, ledger_net
+
+CHECKPOINT_EVERY = 1000  # ledger entries per wallet between checkpoints
+
+
+def latest_checkpoint(wallet):
+    return LedgerCheckpoint.objects.filter(wallet=wallet).order_by('-last_entry_id').first()
+
+
+def maybe_checkpoint(wallet):
+    """
+    Called after posting: checkpoint once a day or every CHECKPOINT_EVERY entries.
+
+    ``wallet.entries_since_checkpoint`` must be current (the posting engine
+    reads it back with the new balance).
+    """
+    if wallet.entries_since_checkpoint >= CHECKPOINT_EVERY:
+        return checkpoint(wallet, latest_checkpoint(wallet))
+    last = latest_checkpoint(wallet)
+    if last is not None and timezone.localdate(last.timestamp) == timezone.localdate():
+        return None
+    return checkpoint(wallet, last)
+
+
+def maybe_checkpoint_many(wallets):
+    """maybe_checkpoint() for a batch of wallets, deciding which are due in a single query."""
+    latest = LedgerCheckpoint.objects.filter(wallet=OuterRef('pk')).order_by('-last_entry_id')
+    state = (Wallet.objects.filter(pk__in=[wallet.pk for wallet in wallets])
+             .annotate(checkpoint_id=Subquery(latest.values('pk')[:1]),
+                       checkpoint_at=Subquery(latest.values('timestamp')[:1]))
+             .values_list('pk', 'checkpoint_id', 'checkpoint_at'))
+
+    today = timezone.localdate()
+    by_id = {wallet.pk: wallet for wallet in wallets}
+    due = [
+        (pk, checkpoint_id) for pk, checkpoint_id, checkpoint_at in state
+        if checkpoint_id is None or timezone.localdate(checkpoint_at) != today
+        or by_id[pk].entries_since_checkpoint >= CHECKPOINT_EVERY
+    ]
+    if not due:
+        return []
+    lasts = LedgerCheckpoint.objects.in_bulk([checkpoint_id for _, checkpoint_id in due if checkpoint_id])
+    created = [checkpoint(by_id[pk], lasts.get(checkpoint_id), reset_count=False) for pk, checkpoint_id in due]
+    created = [cp for cp in created if cp is not None]
+    Wallet.objects.filter(pk__in=[cp.wallet_id for cp in created]).update(entries_since_checkpoint=0)
+    for cp in created:
+        by_id[cp.wallet_id].entries_since_checkpoint = 0
+    return created
+
+
+def checkpoint(wallet, last=None, upto=None, reset_count=True):
+    """
+    Record the balance after the newest entry (or after entry ``upto``).
+
+    The balance is the previous checkpoint plus the net of the entries in
+    between, not the entries' own balance_after, so it is consistent even if
+    some balance_after value is wrong. ``reset_count=False`` leaves zeroing
+    the wallet's entries_since_checkpoint to the caller.
+    """
+    tail = Ledger.objects.filter(wallet=wallet)
+    if last is not None:
+        tail = tail.filter(id__gt=last.last_entry_id)
+    if upto is not None:
+        tail = tail.filter(id__lte=upto)
+    totals = tail.aggregate(net=ledger_net(), last_id=Max('id'))
+    if totals['last_id'] is None:
+        return None
+
+    base = last.balance if last is not None else wallet.opening_balance
+    end = Ledger.objects.only('timestamp').get(pk=totals['last_id'])
+    cp = LedgerCheckpoint.objects.create(
+        wallet=wallet,
+        last_entry=end,
+        timestamp=end.timestamp,
+        balance=base + totals['net'],
+    )
+    if upto is None and reset_count:
+        # Up to the newest entry: start counting again
+        Wallet.objects.filter(pk=wallet.pk).update(entries_since_checkpoint=0)
+        wallet.entries_since_checkpoint = 0
+    return cp
+
+
+def backfill(wallet, every=CHECKPOINT_EVERY):
+    """Checkpoint every ``every`` entries of existing history, then the remaining tail."""
+    created = 0
+    last = latest_checkpoint(wallet)
+    while True:
+        entries = Ledger.objects.filter(wallet=wallet).order_by('id')
+        if last is not None:
+            entries = entries.filter(id__gt=last.last_entry_id)
+        boundary = next(iter(entries.values_list('id', flat=True)[every - 1:every]), None)
+        cp = checkpoint(wallet, last, upto=boundary)
+        if cp is None:
+            return created
+        created += 1
+        last = cp
+        if boundary is None:
+            return created
+
@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+
+# Threads for query groups, shared by all requests in the process. The event loop's
+# default executor is sized by CPU count, which is far too few for threads that
+# mostly wait on the database.
+QUERY_WORKERS = 32
+_executor = ThreadPoolExecutor(QUERY_WORKERS, thread_name_prefix='query-group')
+
+
+def run_all(groups):
+    """Run {name: callable} query groups one after another (the sync views)."""
+    return {name: load() for name, load in groups.items()}
+
+
+async def gather(groups):
+    """
+    Run independent {name: callable} query groups at the same time, each
+    on a worker thread with its own database connection.
+
+    Inside a transaction (e.g. ATOMIC_REQUESTS or a test case) other
+    connections can't see its writes, so the groups then run one after
+    another on the request's own connection instead.
+    """
+    if await sync_to_async(lambda: connection.in_atomic_block)():
+        return await sync_to_async(run_all)(groups)
+    results = await asyncio.gather(*(
+        sync_to_async(_on_own_connection(load), thread_sensitive=False, executor=_executor)() for load in groups.values()
+    ))
+    return dict(zip(groups, results))
+
+
+def _on_own_connection(load):
+    def run():
+        # Worker threads don't see request_started/finished, so honour CONN_MAX_AGE here
+        close_old_connections()
+        try:
+            return load()
+        finally:
+            close_old_connections()
+    return run
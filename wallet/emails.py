@@ -0,0 +1,18 @@
+def transaction_email(tx, wallet, approved=True):
+    """(to, subject, message) telling the wallet owner their transaction was approved or rejected."""
+    status_text = "Approved" if approved else "Rejected"
+    emoji = "✅" if approved else "❌"
+
+    subject = f"{emoji} Transaction {status_text}"
+    message = (
+        f"Dear {wallet.user.username},\n\n"
+        f"Your {tx.tx_type.lower()} transaction has been {status_text.lower()}.\n\n"
+        f"📌 Transaction ID: {tx.id}\n"
+        f"💰 Amount: ₹{tx.amount}\n"
+        f"💳 Wallet: {wallet.account_number}\n"
+        f"📅 {status_text} At: {tx.processed_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"🔐 Status: {tx.status}\n\n"
+        f"Thank you for using WalletApp.\n\n"
+        f"- WalletApp Team"
+    )
+    return wallet.user.email, subject, message
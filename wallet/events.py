@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import threading
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100  # events buffered per connected manager before the oldest are dropped
+REDIS_CHANNEL = 'wallet:pending-events'
+
+
+class Broadcaster:
+    """
+    Fans pending-queue events out to every connected manager in this process.
+
+    Each subscriber is an asyncio.Queue on the event loop serving its
+    stream; publish() may be called from any thread (sync views, signals).
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {(loop, q) for loop, q in self._subscribers if q is not queue}
+
+    def publish(self, event):
+        self.deliver(event)
+
+    def deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put, queue, event)
+            except RuntimeError:
+                # That subscriber's event loop has shut down
+                self.unsubscribe(queue)
+
+
+def _put(queue, event):
+    if queue.full():
+        queue.get_nowait()  # a slow client loses the oldest event, not the newest
+    queue.put_nowait(event)
+
+
+class RedisBroadcaster(Broadcaster):
+    """
+    Broadcaster shared by every worker process through Redis pub/sub.
+
+    publish() goes to Redis; one listener thread per process delivers what
+    comes back to the local subscribers.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._listener = None
+
+    def subscribe(self):
+        queue = super().subscribe()
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='pending-events', daemon=True)
+                self._listener.start()
+        return queue
+
+    def publish(self, event):
+        try:
+            self._redis.publish(REDIS_CHANNEL, json.dumps(event))
+        except Exception as e:
+            logger.warning("Event bus unavailable, delivering locally only: %s", e)
+            self.deliver(event)
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(REDIS_CHANNEL)
+        for message in pubsub.listen():
+            try:
+                self.deliver(json.loads(message['data']))
+            except ValueError:
+                logger.warning("Ignoring malformed event: %r", message['data'])
+
+
+def _make_broadcaster():
+    url = getattr(settings, 'PENDING_EVENTS_REDIS_URL', None)
+    return RedisBroadcaster(url) if url else Broadcaster()
+
+
+broadcaster = _make_broadcaster()
+
+
+def publish_on_commit(event):
+    # Managers only hear about changes that actually committed
+    db_transaction.on_commit(lambda: broadcaster.publish(event))
+
+
+def transaction_created(tx):
+    publish_on_commit({
+        'event': 'created',
+        'id': tx.pk,
+        'user': tx.wallet.user.username,
+        'tx_type': tx.tx_type,
+        'amount': str(tx.amount),
+        'currency': tx.wallet.currency.code,
+        'target_currency': tx.target_wallet.currency.code if tx.target_wallet_id else None,
+        'note': tx.note,
+        'created_at': tx.created_at.isoformat(),
+    })
+
+
+def transactions_processed(status, tx_ids):
+    if tx_ids:
+        publish_on_commit({'event': status.lower(), 'ids': list(tx_ids)})
@@ -1,6 +1,45 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from .models import CustomUser, Transaction, Wallet
+from .models import CustomUser, Transaction, Wallet, TRANSACTION_TYPE_CHOICES, TRANSACTION_STATUS_CHOICES
+from .utils import annotated_wallets
+
+
+# -------------------------------
+# Wallet select over preloaded wallets
+# -------------------------------
+class WalletChoiceField(forms.ModelChoiceField):
+    """
+    A wallet select built from wallets the request already loaded (see
+    utils.request_wallets), so rendering and validating it runs no queries.
+    """
+
+    def __init__(self, wallets, **kwargs):
+        self.wallets = list(wallets)
+        super().__init__(queryset=Wallet.objects.filter(pk__in=[wallet.pk for wallet in self.wallets]), **kwargs)
+
+    def _get_choices(self):
+        choices = [] if self.empty_label is None else [('', self.empty_label)]
+        return choices + [(wallet.pk, self.label_from_instance(wallet)) for wallet in self.wallets]
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+    def label_from_instance(self, wallet):
+        return f"{wallet.currency.code} - {wallet.account_number} (₹{wallet.available} available)"
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        for wallet in self.wallets:
+            if str(wallet.pk) == str(value):
+                return wallet
+        raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
+
+def _own_wallet_field(form, user, wallets):
+    form.fields['wallet'] = WalletChoiceField(
+        annotated_wallets(user) if wallets is None else wallets,
+        label=form.fields['wallet'].label,
+    )
 
 
 # -------------------------------
@@ -79,8 +118,9 @@ class DepositForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user')
+        wallets = kwargs.pop('wallets', None)
         super().__init__(*args, **kwargs)
-        self.fields['wallet'].queryset = Wallet.objects.filter(user=user)
+        _own_wallet_field(self, user, wallets)
 
 
 # -------------------------------
@@ -93,8 +133,9 @@ class WithdrawForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user')
+        wallets = kwargs.pop('wallets', None)
         super().__init__(*args, **kwargs)
-        self.fields['wallet'].queryset = Wallet.objects.filter(user=user)
+        _own_wallet_field(self, user, wallets)
 
     def clean(self):
         cleaned_data = super().clean()
@@ -134,12 +175,13 @@ class TransferForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user')
+        wallets = kwargs.pop('wallets', None)
         super().__init__(*args, **kwargs)
 
         # User can transfer between their own wallets as well
         self.user = user
-        self.fields['wallet'].queryset = Wallet.objects.filter(user=user)
-        self.fields['target_wallet'].queryset = Wallet.objects.exclude(id__in=self.fields['wallet'].queryset.values_list('id', flat=True)) | Wallet.objects.filter(user=user)
+        _own_wallet_field(self, user, wallets)
+        self.fields['target_wallet'].queryset = Wallet.objects.select_related('user', 'currency')
 
     def clean(self):
         cleaned_data = super().clean()
@@ -176,3 +218,46 @@ class OTPForm(forms.Form):
         })
     )
 
+
+
+# -------------------------------
+# Manager Transaction Search
+# -------------------------------
+class TransactionSearchForm(forms.Form):
+    user = forms.CharField(
+        required=False, max_length=100,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Username, name or email'})
+    )
+    account = forms.RegexField(
+        regex=r'^\d+$', required=False, max_length=20,
+        error_messages={'invalid': 'Account numbers are digits only.'},
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Account number starts with'})
+    )
+    tx_type = forms.ChoiceField(
+        required=False, choices=[('', 'Any type')] + TRANSACTION_TYPE_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    status = forms.ChoiceField(
+        required=False, choices=[('', 'Any status')] + TRANSACTION_STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    min_amount = forms.DecimalField(
+        required=False, min_value=0, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Min ₹', 'step': '0.01'})
+    )
+    max_amount = forms.DecimalField(
+        required=False, min_value=0, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Max ₹', 'step': '0.01'})
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        low, high = cleaned_data.get('min_amount'), cleaned_data.get('max_amount')
+        if low is not None and high is not None and low > high:
+            raise forms.ValidationError("Min amount is above max amount.")
+        start, end = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if start and end and start > end:
+            raise forms.ValidationError("Start date is after end date.")
+        return cleaned_data
@@ -0,0 +1,291 @@
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+from django.db.models import Case, SmallIntegerField, Value, When
+from django.utils import timezone
+from .models import Transaction, FraudLog, TRANSACTION_TYPE_CHOICES, TRANSACTION_STATUS_CHOICES
+from . import limits, panels, summary, velocity
+
+# Constants
+FRAUD_AMOUNT_LIMIT = Decimal('500000')  # ₹5,00,000
+FRAUD_TXN_COUNT = 3
+FRAUD_TIME_WINDOW_MINUTES = 10
+DAILY_WITHDRAWAL_LIMIT = Decimal('500000')
+ADMIN_EMAIL = "admin@walletapp.com"
+
+# Thresholds the rules read from batch.params; the backtest overrides them per grid point
+PARAMS = {
+    'amount_limit': FRAUD_AMOUNT_LIMIT,
+    'txn_count': FRAUD_TXN_COUNT,
+    'window_minutes': FRAUD_TIME_WINDOW_MINUTES,
+    'daily_limit': DAILY_WITHDRAWAL_LIMIT,
+}
+
+# tx_type and status are held in batches as int8 indexes into the model choices
+TX_TYPES = {value: code for code, (value, _) in enumerate(TRANSACTION_TYPE_CHOICES)}
+STATUSES = {value: code for code, (value, _) in enumerate(TRANSACTION_STATUS_CHOICES)}
+
+Rule = namedtuple('Rule', ['name', 'evaluate', 'reason', 'subject', 'message'])
+Hit = namedtuple('Hit', ['rule', 'log'])
+
+RULES = []
+
+
+def rule(name, reason, subject=None, message=None):
+    """
+    Register a fraud rule.
+
+    The decorated function takes a TransactionBatch and returns a boolean
+    NumPy mask of the rows it flags, reading its thresholds from
+    ``batch.params`` (defaults in PARAMS). ``reason(batch, i)`` builds the FraudLog
+    reason for row i. Rules with a ``subject`` email the user (see
+    wallet.alerts); ``message(tx, log)`` builds that email.
+    """
+    def decorator(evaluate):
+        RULES.append(Rule(name, evaluate, reason, subject, message))
+        return evaluate
+    return decorator
+
+
+def _choice_code(field, codes):
+    return Case(*[When(**{field: value}, then=Value(code)) for value, code in codes.items()],
+                default=Value(-1), output_field=SmallIntegerField())
+
+
+class TransactionBatch:
+    """
+    Columnar view of a set of transactions, plus the context columns rules need.
+
+    Rows are FIELDS tuples, with tx_type and status already given as their
+    TX_TYPES / STATUSES codes; rows() has the database do that encoding.
+    """
+
+    FIELDS = ('id', 'wallet_id', 'wallet__user_id', 'tx_type_code', 'status_code', 'amount', 'created_at', 'processed_at')
+
+    @classmethod
+    def rows(cls, queryset):
+        """FIELDS tuples for a Transaction queryset, coded in SQL so no per-row strings are built."""
+        return queryset.annotate(
+            tx_type_code=_choice_code('tx_type', TX_TYPES),
+            status_code=_choice_code('status', STATUSES),
+        ).values_list(*cls.FIELDS)
+
+    def __init__(self, rows, params=None):
+        self.params = {**PARAMS, **(params or {})}
+        columns = list(zip(*rows)) if rows else [()] * len(self.FIELDS)
+        ids, wallet_ids, user_ids, tx_types, statuses, amounts, created, processed = columns
+        self.ids = np.array(ids, dtype=np.int64)
+        self.wallet_ids = np.array(wallet_ids, dtype=np.int64)
+        self.user_ids = np.array(user_ids, dtype=np.int64)
+        self.tx_types = np.array(tx_types, dtype=np.int8)
+        self.statuses = np.array(statuses, dtype=np.int8)
+        self.amounts = np.array([float(a) for a in amounts], dtype=np.float64)
+        self.created_at = np.array([c.timestamp() for c in created], dtype=np.int64)
+        self.processed_at = np.array([(p or c).timestamp() for p, c in zip(processed, created)], dtype=np.int64)
+        # Context columns, filled by compute_context() or by the inline path
+        self.window_counts = np.zeros(len(self.ids), dtype=np.int64)
+        self.withdrawn_24h = np.zeros(len(self.ids), dtype=np.float64)
+
+    @classmethod
+    def concat(cls, batches, params=None):
+        """One batch holding the rows of several (e.g. chunks loaded one after another)."""
+        batch = cls([], params)
+        for name in ('ids', 'wallet_ids', 'user_ids', 'tx_types', 'statuses', 'amounts', 'created_at',
+                     'processed_at', 'window_counts', 'withdrawn_24h'):
+            setattr(batch, name, np.concatenate([getattr(b, name) for b in batches]))
+        return batch
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def approved_withdrawals(self):
+        return (self.tx_types == TX_TYPES['WITHDRAW']) & (self.statuses == STATUSES['APPROVED'])
+
+    def compute_context(self):
+        """Fill the context columns from the batch itself (bulk sweeps)."""
+        if not len(self):
+            return
+        self.window_counts = window_counts(self.wallet_ids, self.created_at, self.params['window_minutes'] * 60)
+        eligible = self.approved_withdrawals
+        self.withdrawn_24h = np.zeros(len(self), dtype=np.float64)
+        if eligible.any():
+            self.withdrawn_24h[eligible] = window_sums(
+                self.wallet_ids[eligible], self.processed_at[eligible], self.amounts[eligible], 24 * 3600,
+            )
+
+
+def window_counts(groups, times, window):
+    # Rows per group with time in [t - window, t], including ties, for every row
+    order = np.lexsort((times, groups))
+    keys = _sorted_keys(groups[order], times[order], window)
+    left = np.searchsorted(keys, keys - window, side='left')
+    right = np.searchsorted(keys, keys, side='right')
+    counts = np.empty(len(keys), dtype=np.int64)
+    counts[order] = right - left
+    return counts
+
+
+def window_sums(groups, times, values, window):
+    order = np.lexsort((times, groups))
+    keys = _sorted_keys(groups[order], times[order], window)
+    left = np.searchsorted(keys, keys - window, side='left')
+    right = np.searchsorted(keys, keys, side='right')
+    cumulative = np.concatenate(([0.0], np.cumsum(values[order])))
+    sums = np.empty(len(keys), dtype=np.float64)
+    sums[order] = cumulative[right] - cumulative[left]
+    return sums
+
+
+def _sorted_keys(groups, times, window):
+    # One sortable int64 per row so a single searchsorted can't cross into another group
+    span = int(times.max() - times.min()) + window + 1
+    return (groups - groups.min()) * span + (times - times.min())
+
+
+def evaluate(batch):
+    """Run every registered rule over the batch: yields (row index, rule)."""
+    for r in RULES:
+        for i in np.flatnonzero(r.evaluate(batch)):
+            yield int(i), r
+
+
+def flag(batch, rows=None):
+    """
+    Evaluate the batch and bulk-insert the resulting FraudLog rows.
+
+    ``rows`` limits flagging to a boolean mask (the rest is lookback context).
+    A transaction is never flagged twice with the same reason.
+    """
+    found = []
+    for i, r in evaluate(batch):
+        if rows is None or rows[i]:
+            found.append((r, FraudLog(
+                user_id=int(batch.user_ids[i]),
+                transaction_id=int(batch.ids[i]),
+                reason=r.reason(batch, i),
+            )))
+    if not found:
+        return []
+
+    existing = set(FraudLog.objects.filter(
+        transaction_id__in={log.transaction_id for _, log in found},
+    ).values_list('transaction_id', 'reason'))
+    hits = []
+    for r, log in found:
+        key = (log.transaction_id, log.reason)
+        if key not in existing:
+            existing.add(key)
+            hits.append(Hit(r, log))
+    FraudLog.objects.bulk_create([hit.log for hit in hits])
+    summary.fraud_flagged([hit.log for hit in hits])
+    panels.touch(*{hit.log.user_id for hit in hits})
+    return hits
+
+
+def check_transaction(tx, created=False):
+    """Inline evaluation of one transaction; context comes from counters instead of the batch."""
+    return check_transactions([tx], created=created)
+
+
+def check_transactions(txs, created=False):
+    """Inline evaluation of saved transactions, reading each wallet's counters once."""
+    batch = TransactionBatch([
+        (tx.pk, tx.wallet_id, tx.wallet.user_id, TX_TYPES[tx.tx_type], STATUSES[tx.status], tx.amount,
+         tx.created_at, tx.processed_at)
+        for tx in txs
+    ])
+    if len(txs) == 1:
+        tx = txs[0]
+        batch.window_counts[0] = velocity.count(tx.wallet_id, FRAUD_TIME_WINDOW_MINUTES, unrecorded=1 if created else 0)
+        if batch.approved_withdrawals[0]:
+            batch.withdrawn_24h[0] = float(limits.withdrawn_within(tx.wallet_id, 24))
+        return flag(batch)
+
+    counts = velocity.count_many(set(batch.wallet_ids.tolist()), FRAUD_TIME_WINDOW_MINUTES, unrecorded=1 if created else 0)
+    eligible = batch.approved_withdrawals
+    withdrawing = set(batch.wallet_ids[eligible].tolist())
+    withdrawn = limits.withdrawn_within_many(withdrawing, 24) if withdrawing else {}
+    batch.window_counts[:] = [counts[wallet_id] for wallet_id in batch.wallet_ids.tolist()]
+    for i in np.flatnonzero(eligible):
+        batch.withdrawn_24h[i] = float(withdrawn[int(batch.wallet_ids[i])])
+    return flag(batch)
+
+
+def sweep(since, until=None, wallets_per_chunk=1000):
+    """
+    Nightly sweep: evaluate every transaction created in [since, until).
+
+    Works through wallet id ranges so each wallet's history lands in a
+    single batch, loading a day of lookback for the window rules.
+    """
+    until = until or timezone.now()
+    lookback = since - timedelta(hours=24)
+    base = Transaction.objects.filter(created_at__gte=lookback, created_at__lt=until)
+    bounds = base.order_by('wallet_id').values_list('wallet_id', flat=True)
+    first, last = bounds.first(), bounds.last()
+    if first is None:
+        return 0, 0
+
+    evaluated = flagged = 0
+    for lo in range(first, last + 1, wallets_per_chunk):
+        rows = list(TransactionBatch.rows(base.filter(wallet_id__gte=lo, wallet_id__lt=lo + wallets_per_chunk)))
+        if not rows:
+            continue
+        batch = TransactionBatch(rows)
+        batch.compute_context()
+        in_range = batch.created_at >= int(since.timestamp())
+        evaluated += int(in_range.sum())
+        flagged += len(flag(batch, rows=in_range))
+    return evaluated, flagged
+
+
+# --- Rules ---
+
+def _alert_message(tx, log):
+    return (
+        f"A suspicious transaction was flagged on your wallet.\n\n"
+        f"Transaction ID: {tx.id}\n"
+        f"Amount: ₹{tx.amount}\n"
+        f"Date: {tx.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"Reason: {log.reason}\n\n"
+        f"If this wasn't you, please contact support."
+    )
+
+
+def _pattern_message(tx, log):
+    return (
+        f"Multiple transactions were detected in a short time window.\n\n"
+        f"User: {tx.wallet.user.username}\n"
+        f"Reason: {log.reason}\n"
+        f"Time Frame: {FRAUD_TIME_WINDOW_MINUTES} minutes\n"
+        f"Latest Tx ID: {tx.id}\n\n"
+        f"If this activity seems suspicious, please review immediately."
+    )
+
+
+@rule('high_value',
+      reason=lambda batch, i: f"⚠️ High-value transaction over ₹{batch.params['amount_limit']}",
+      subject="⚠️ Fraud Alert: High-Value Transaction",
+      message=_alert_message)
+def high_value(batch):
+    return batch.amounts >= float(batch.params['amount_limit'])
+
+
+@rule('velocity',
+      reason=lambda batch, i: f"⚠️ {batch.window_counts[i]} transactions within {batch.params['window_minutes']} minutes",
+      subject="⚠️ Fraud Alert: Suspicious Transaction Pattern",
+      message=_pattern_message)
+def rapid_transactions(batch):
+    return batch.window_counts >= batch.params['txn_count']
+
+
+@rule('large_withdrawal', reason=lambda batch, i: "Withdraw above ₹5L")
+def large_withdrawal(batch):
+    return batch.approved_withdrawals & (batch.amounts > float(batch.params['amount_limit']))
+
+
+@rule('daily_withdrawals', reason=lambda batch, i: "Withdrawals exceeded ₹5L in 24 hours")
+def daily_withdrawals(batch):
+    return batch.approved_withdrawals & (batch.withdrawn_24h > float(batch.params['daily_limit']))
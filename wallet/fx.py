@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from .models import FxRate
+
+logger = logging.getLogger(__name__)
+
+PIVOT_CURRENCY = 'INR'  # cross rates are derived through this currency
+CACHE_KEY = 'fx:matrix'
+CACHE_TTL = 300  # rates scheduled for later take effect within this long
+LOCAL_TTL = 30  # how stale a process's own copy of the matrix may get
+HISTORY_CACHE_SIZE = 128  # pair histories kept in memory for rate_at()
+
+ONE = Decimal('1')
+
+
+class RateUnavailable(Exception):
+    pass
+
+
+class FxRateService:
+    """
+    Current and historical exchange rates.
+
+    Current rates are a full {(base, quote): rate} matrix, built once per
+    change and shared through the cache, so a lookup is a dict access.
+    Pairs without a quote of their own go through PIVOT_CURRENCY.
+    """
+
+    def __init__(self, pivot=PIVOT_CURRENCY):
+        self.pivot = pivot
+        self._matrix = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache(self):
+        return caches[getattr(settings, 'FX_RATE_CACHE', 'default')]
+
+    # --- current rates ---
+
+    def rate(self, base, quote):
+        if base == quote:
+            return ONE
+        try:
+            return self.matrix()[(base, quote)]
+        except KeyError:
+            raise RateUnavailable(f"No exchange rate for {base}/{quote}") from None
+
+    def matrix(self):
+        if self._matrix is not None and time.monotonic() - self._loaded_at < LOCAL_TTL:
+            return self._matrix
+        try:
+            cached = self._cache().get(CACHE_KEY)
+        except Exception as e:
+            logger.warning("FX rate cache unavailable: %s", e)
+            cached = None
+        if cached is None:
+            cached = self._publish(self._build())
+        self._use(*cached)
+        return self._matrix
+
+    def invalidate(self):
+        """Rebuild the matrix after a rate changed (called once the change commits)."""
+        self._use(*self._publish(self._build()))
+
+    def _use(self, version, matrix):
+        if version != self._version:
+            with self._lock:
+                self._histories.clear()
+        self._matrix, self._version = matrix, version
+        self._loaded_at = time.monotonic()
+
+    def _publish(self, matrix):
+        entry = (time.time(), matrix)
+        try:
+            self._cache().set(CACHE_KEY, entry, CACHE_TTL)
+        except Exception as e:
+            logger.warning("FX rate cache unavailable: %s", e)
+        return entry
+
+    def _build(self):
+        now = timezone.now()
+        latest = FxRate.objects.filter(
+            base=OuterRef('base'), quote=OuterRef('quote'), effective_at__lte=now,
+        ).order_by('-effective_at', '-id').values('pk')[:1]
+        quoted = dict(
+            ((base, quote), rate)
+            for base, quote, rate in FxRate.objects.filter(pk=Subquery(latest)).values_list('base', 'quote', 'rate')
+        )
+        return derive_matrix(quoted, self.pivot)
+
+    # --- historical rates ---
+
+    def rate_at(self, pair, ts):
+        """The rate in effect for ``pair`` at ``ts``, from the same sources as the matrix."""
+        base, quote = pair
+        if base == quote:
+            return ONE
+        self.matrix()  # drops cached histories once the rates have changed
+        rate = self._quoted_at(base, quote, ts)
+        if rate is None and self.pivot not in pair:
+            to_pivot = self._quoted_at(base, self.pivot, ts)
+            from_pivot = self._quoted_at(quote, self.pivot, ts)
+            if to_pivot is not None and from_pivot is not None:
+                rate = to_pivot / from_pivot
+        if rate is None:
+            raise RateUnavailable(f"No exchange rate for {base}/{quote} at {ts}")
+        return rate
+
+    def _quoted_at(self, base, quote, ts):
+        # Direct quote first, then the inverse of the opposite quote
+        rate = self._lookup(base, quote, ts)
+        if rate is not None:
+            return rate
+        inverse = self._lookup(quote, base, ts)
+        return ONE / inverse if inverse is not None else None
+
+    def _lookup(self, base, quote, ts):
+        times, rates = self._history(base, quote)
+        i = bisect_right(times, ts.timestamp())
+        return rates[i - 1] if i else None
+
+    def _history(self, base, quote):
+        key = (base, quote)
+        with self._lock:
+            if key in self._histories:
+                self._histories.move_to_end(key)
+                return self._histories[key]
+        rows = FxRate.objects.filter(base=base, quote=quote).order_by('effective_at', 'id').values_list('effective_at', 'rate')
+        history = ([ts.timestamp() for ts, _ in rows], [rate for _, rate in rows])
+        with self._lock:
+            self._histories[key] = history
+            if len(self._histories) > HISTORY_CACHE_SIZE:
+                self._histories.popitem(last=False)
+        return history
+
+
+def derive_matrix(quoted, pivot):
+    """
+    Every pair that can be priced from ``quoted``: direct quotes win, then the
+    inverse of the opposite quote, then the cross rate through ``pivot``.
+    """
+    matrix = dict(quoted)
+    for (base, quote), rate in quoted.items():
+        matrix.setdefault((quote, base), ONE / rate)
+    to_pivot = {base: rate for (base, quote), rate in matrix.items() if quote == pivot}
+    to_pivot[pivot] = ONE
+    for base in to_pivot:
+        for quote in to_pivot:
+            if base != quote:
+                matrix.setdefault((base, quote), to_pivot[base] / to_pivot[quote])
+    return matrix
+
+
+rates = FxRateService()
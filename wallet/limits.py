@@ -0,0 +1,74 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+from .models import WithdrawalBucket
+
+BUCKET_RETENTION_HOURS = 48
+
+
+def _hour(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def record_withdrawal(wallet_id, amount, ts=None):
+    """Add an approved withdrawal to its hourly bucket (called inside the posting transaction)."""
+    hour = _hour(ts or timezone.now())
+    bucket = WithdrawalBucket.objects.filter(wallet_id=wallet_id, hour=hour)
+    if bucket.update(total=F('total') + amount):
+        return
+    try:
+        with db_transaction.atomic():
+            WithdrawalBucket.objects.create(wallet_id=wallet_id, hour=hour, total=amount)
+    except IntegrityError:
+        # Another posting created this hour's bucket first
+        bucket.update(total=F('total') + amount)
+        return
+    # First withdrawal of a new hour: drop buckets no window reads any more
+    WithdrawalBucket.objects.filter(
+        wallet_id=wallet_id, hour__lt=hour - timedelta(hours=BUCKET_RETENTION_HOURS),
+    ).delete()
+
+
+def record_withdrawals(amounts, ts=None):
+    """
+    record_withdrawal() for many wallets at once ({wallet_id: amount}).
+
+    The caller must hold the wallets' row locks (as bulk approval does), so
+    no other posting can create the same buckets in between.
+    """
+    if not amounts:
+        return
+    hour = _hour(ts or timezone.now())
+    buckets = WithdrawalBucket.objects.filter(wallet_id__in=list(amounts), hour=hour)
+    existing = set(buckets.values_list('wallet_id', flat=True))
+    if existing:
+        buckets.filter(wallet_id__in=existing).update(total=F('total') + Case(
+            *[When(wallet_id=wallet_id, then=Value(amounts[wallet_id])) for wallet_id in existing],
+        ))
+    new = [wallet_id for wallet_id in amounts if wallet_id not in existing]
+    if new:
+        WithdrawalBucket.objects.bulk_create([
+            WithdrawalBucket(wallet_id=wallet_id, hour=hour, total=amounts[wallet_id]) for wallet_id in new
+        ])
+        WithdrawalBucket.objects.filter(
+            wallet_id__in=new, hour__lt=hour - timedelta(hours=BUCKET_RETENTION_HOURS),
+        ).delete()
+
+
+def withdrawn_within_many(wallet_ids, hours, now=None):
+    """withdrawn_within() for many wallets in one grouped query: {wallet_id: total}."""
+    start = _hour(now or timezone.now()) - timedelta(hours=hours - 1)
+    totals = dict(
+        WithdrawalBucket.objects.filter(wallet_id__in=list(wallet_ids), hour__gte=start)
+        .order_by().values('wallet_id').annotate(total=Sum('total')).values_list('wallet_id', 'total')
+    )
+    return {wallet_id: totals.get(wallet_id, Decimal('0.00')) for wallet_id in wallet_ids}
+
+
+def withdrawn_within(wallet_id, hours, now=None):
+    """Approved withdrawals in the current hour and the ``hours - 1`` before it: at most ``hours`` rows."""
+    start = _hour(now or timezone.now()) - timedelta(hours=hours - 1)
+    total = WithdrawalBucket.objects.filter(wallet_id=wallet_id, hour__gte=start).aggregate(total=Sum('total'))['total']
+    return total or Decimal('0.00')
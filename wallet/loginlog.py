@@ -0,0 +1,184 @@
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import close_old_connections, transaction as db_transaction
+from .models import LoginHistory
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 200  # buffered events that trigger an early flush
+FLUSH_INTERVAL = 2.0  # seconds between flushes otherwise
+MAX_BUFFERED = 10000  # events held per kind; newer ones are dropped (and logged) past this
+MAX_ATTEMPTS = 5  # flushes an event may fail before it is dropped
+LOGOUT_CHUNK = 200  # sessions looked up per query when applying logouts
+
+
+class LoginBuffer:
+    """
+    Collects login and logout events and writes them in batches.
+
+    A background thread flushes every FLUSH_INTERVAL seconds, or as soon as
+    FLUSH_SIZE events are waiting: logins go in with one bulk_create, and
+    logouts are applied with one SELECT of the open sessions plus one
+    bulk_update per LOGOUT_CHUNK sessions. close() (registered with atexit) writes whatever is left.
+
+    If a batch of logins fails it is retried row by row, so one bad row
+    can't hold up the rest; a row that keeps failing is logged and dropped
+    after MAX_ATTEMPTS flushes. The buffer never holds more than
+    MAX_BUFFERED events of each kind.
+    """
+
+    def __init__(self, size=FLUSH_SIZE, interval=FLUSH_INTERVAL):
+        self.size = size
+        self.interval = interval
+        self._logins = []  # [fields, session, attempts]
+        self._logouts = []  # [(user_id, session_key, when), attempts]
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def login(self, session=None, **fields):
+        # The session key is read at flush time, after the response has saved the session
+        self._add(self._logins, [fields, session, 0])
+
+    def logout(self, user_id, session_key, when):
+        self._add(self._logouts, [(user_id, session_key, when), 0])
+
+    def _add(self, events, event):
+        with self._lock:
+            if len(events) >= MAX_BUFFERED:
+                self._dropped += 1
+                return
+            events.append(event)
+            waiting = len(self._logins) + len(self._logouts)
+            if self._thread is None or not self._thread.is_alive():
+                # Started lazily, so each forked worker gets its own thread
+                self._thread = threading.Thread(target=self._run, name='login-history', daemon=True)
+                self._thread.start()
+        if waiting >= self.size:
+            self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not write login history; will retry")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write everything buffered so far; returns (logins written, logouts applied)."""
+        with self._flush_lock:
+            with self._lock:
+                logins, self._logins = self._logins, []
+                logouts, self._logouts = self._logouts, []
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                logger.error("Login history buffer full: dropped %d event(s)", dropped)
+
+            # Logins first, so a logout buffered with its own login finds the row
+            written, retry = _write_logins(logins)
+            try:
+                applied = _apply_logouts([event for event, _ in logouts])
+            except Exception:
+                logger.exception("Could not apply %d logout(s)", len(logouts))
+                applied = 0
+                retry_logouts = logouts
+            else:
+                retry_logouts = []
+            self._requeue(self._logins, retry, 'login')
+            self._requeue(self._logouts, retry_logouts, 'logout')
+            return written, applied
+
+    def _requeue(self, events, failed, kind):
+        keep = []
+        for event in failed:
+            event[-1] += 1
+            if event[-1] < MAX_ATTEMPTS:
+                keep.append(event)
+            else:
+                logger.error("Dropping %s event after %d failed attempts: %r", kind, MAX_ATTEMPTS, event[:-1])
+        with self._lock:
+            # Ahead of newer events, within the cap
+            events[:0] = keep[:max(0, MAX_BUFFERED - len(events))]
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+
+def _login_row(fields, session):
+    session_key = fields.pop('session_key', None) or (session.session_key if session is not None else None)
+    return LoginHistory(session_key=session_key or "N/A", **fields)
+
+
+def _write_logins(logins):
+    """Insert buffered logins; returns (rows written, events that failed)."""
+    if not logins:
+        return 0, []
+    rows = [_login_row(dict(fields), session) for fields, session, _ in logins]
+    try:
+        LoginHistory.objects.bulk_create(rows)
+        return len(rows), []
+    except Exception as e:
+        logger.warning("Login history batch failed, retrying row by row: %s", e)
+    written, failed = 0, []
+    for event, row in zip(logins, rows):
+        try:
+            with db_transaction.atomic():
+                row.save(force_insert=True)
+            written += 1
+        except Exception:
+            logger.exception("Could not write login history for user %s", row.user_id)
+            failed.append(event)
+    return written, failed
+
+
+def _apply_logouts(logouts):
+    if not logouts:
+        return 0
+    # The first logout time wins if a session appears twice
+    when = {}
+    for user_id, session_key, ts in logouts:
+        when.setdefault((user_id, session_key), ts)
+    session_keys = list({session_key for _, session_key in when})
+    applied = 0
+    for start in range(0, len(session_keys), LOGOUT_CHUNK):
+        # An IN list per chunk: an OR of (user, session) pairs overflows SQLite's expression depth
+        candidates = LoginHistory.objects.filter(
+            session_key__in=session_keys[start:start + LOGOUT_CHUNK], logout_time__isnull=True,
+        ).only('id', 'user_id', 'session_key')
+        rows = [row for row in candidates if (row.user_id, row.session_key) in when]
+        for row in rows:
+            row.logout_time = when[(row.user_id, row.session_key)]
+        LoginHistory.objects.bulk_update(rows, ['logout_time'])
+        applied += len(rows)
+    return applied
+
+
+buffer = LoginBuffer()
+atexit.register(buffer.close)
+
+
+def record_login(session=None, **fields):
+    if getattr(settings, 'LOGIN_HISTORY_BUFFERED', True):
+        buffer.login(session=session, **fields)
+    else:
+        _login_row(fields, session).save(force_insert=True)
+
+
+def record_logout(user_id, session_key, when):
+    if getattr(settings, 'LOGIN_HISTORY_BUFFERED', True):
+        buffer.logout(user_id, session_key, when)
+    else:
+        _apply_logouts([(user_id, session_key, when)])
@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from wallet import backtest, fraud
+
+
+class Command(BaseCommand):
+    help = "Count how many historical transactions candidate fraud thresholds would flag (FraudLog is not touched)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Only transactions created at or after this ISO datetime")
+        parser.add_argument('--until', help="Only transactions created before this ISO datetime")
+        parser.add_argument('--amount-limit', type=float, nargs='+', default=[float(fraud.FRAUD_AMOUNT_LIMIT)])
+        parser.add_argument('--txn-count', type=int, nargs='+', default=[fraud.FRAUD_TXN_COUNT])
+        parser.add_argument('--window', type=int, nargs='+', default=[fraud.FRAUD_TIME_WINDOW_MINUTES],
+                            help="Velocity window(s) in minutes")
+        parser.add_argument('--daily-limit', type=float, nargs='+', default=[float(fraud.DAILY_WITHDRAWAL_LIMIT)])
+        parser.add_argument('--param', action='append', default=[], metavar='NAME=V1,V2',
+                            help="Candidate values for any other fraud.PARAMS entry (repeatable)")
+        parser.add_argument('--chunk-size', type=int, default=backtest.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        grid = {
+            'amount_limit': options['amount_limit'],
+            'txn_count': options['txn_count'],
+            'window_minutes': options['window'],
+            'daily_limit': options['daily_limit'],
+        }
+        for param in options['param']:
+            name, _, values = param.partition('=')
+            if name not in fraud.PARAMS or not values:
+                raise CommandError(f"Expected NAME=V1,V2 with NAME one of {', '.join(fraud.PARAMS)}: {param}")
+            grid[name] = [float(v) for v in values.split(',')]
+
+        started = time.monotonic()
+        batch = backtest.load_batch(
+            backtest.parse_when(options['since']), backtest.parse_when(options['until']),
+            chunk_size=options['chunk_size'],
+        )
+        if batch is None:
+            self.stdout.write("No transactions in range.")
+            return
+        loaded = time.monotonic()
+
+        results = backtest.run_grid(batch, grid)
+        done = time.monotonic()
+
+        headers = list(results[0])
+        self.stdout.write("\t".join(headers))
+        for row in results:
+            self.stdout.write("\t".join(str(row[h]) for h in headers))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(batch)} transactions, {len(results)} configurations, {len(fraud.RULES)} rules: "
+            f"load {loaded - started:.2f}s, evaluate {done - loaded:.2f}s"
+        ))
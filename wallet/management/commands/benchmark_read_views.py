@@ -0,0 +1,191 @@
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from wallet.models import CustomUser, Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare latency and throughput of the read pages (dashboard, ledger, manager dashboard, "
+        "login history) under the WSGI handler with the sync views and the ASGI handler with the "
+        "async views, at the same concurrency. Runs against the configured database and cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Customer whose pages are fetched (default: first user with a wallet)")
+        parser.add_argument('--manager', help="Manager whose pages are fetched (default: first manager)")
+        parser.add_argument('--requests', type=int, default=400, help="Requests per page")
+        parser.add_argument('--concurrency', type=int, default=16, help="Requests in flight at once")
+        parser.add_argument('--db-latency-ms', type=float, default=0,
+                            help="Extra delay per query, to stand in for a database across the network")
+        parser.add_argument('--mode', choices=['both', 'wsgi', 'asgi'], default='both')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            return self.compare(options)
+        # Child process: one handler, routed to the matching views (see wallet.urls.read_view)
+        if settings.ASYNC_READ_VIEWS != (options['mode'] == 'asgi'):
+            raise CommandError("Run with --mode both, which sets MULTIWALLET_ASYNC_VIEWS for each handler.")
+        settings.RATELIMIT_ENABLE = False  # measure the pages, not wallet.throttle's limits
+        if options['db_latency_ms']:
+            delay_queries(options['db_latency_ms'] / 1000)
+        pages = self.pages(options)
+        run = self.run_asgi if options['mode'] == 'asgi' else self.run_wsgi
+        self.stdout.write(json.dumps(run(pages, options['requests'], options['concurrency'])))
+
+    def compare(self, options):
+        results = {}
+        for mode in ('wsgi', 'asgi'):
+            args = [sys.executable, sys.argv[0], 'benchmark_read_views', '--mode', mode,
+                    '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+                    '--db-latency-ms', str(options['db_latency_ms'])]
+            for name in ('user', 'manager'):
+                if options[name]:
+                    args += [f'--{name}', options[name]]
+            env = {**os.environ, 'MULTIWALLET_ASYNC_VIEWS': '1' if mode == 'asgi' else '0'}
+            child = subprocess.run(args, env=env, capture_output=True, text=True)
+            if child.returncode:
+                raise CommandError(child.stderr.strip())
+            results[mode] = json.loads(child.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(
+            f"{options['requests']} requests per page, {options['concurrency']} in flight, "
+            f"+{options['db_latency_ms']:g} ms per query (in-process handlers, no HTTP server)"
+        )
+        self.stdout.write(f"{'page':<18}{'handler':<8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}")
+        for page in results['wsgi']:
+            for mode in ('wsgi', 'asgi'):
+                r = results[mode][page]
+                self.stdout.write(
+                    f"{page:<18}{mode:<8}{r['throughput']:>9.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}"
+                    f"{r['p99']:>9.1f}{r['max']:>9.1f}{r['errors']:>8}"
+                )
+
+    def pages(self, options):
+        wallets = Wallet.objects.select_related('user').order_by('id')
+        wallet = (wallets.filter(user__username=options['user']) if options['user'] else wallets).first()
+        managers = CustomUser.objects.filter(role='manager').order_by('id')
+        manager = (managers.filter(username=options['manager']) if options['manager'] else managers).first()
+        if wallet is None or manager is None:
+            raise CommandError("Needs a customer with a wallet and a manager in the database.")
+        customer, boss = session_cookie(wallet.user), session_cookie(manager)
+        return {
+            'dashboard': (reverse('dashboard_view'), '', customer),
+            'ledger': (reverse('ledger_view'), f'wallet={wallet.pk}', customer),
+            'manager_dashboard': (reverse('manager_dashboard'), '', boss),
+            'login_history': (reverse('manager_login_history'), '', boss),
+        }
+
+    def run_wsgi(self, pages, requests, concurrency):
+        handler = WSGIHandler()
+
+        def fetch(page):
+            path, query, cookie = page
+            status = []
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOST,
+                'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            }
+            started = time.perf_counter()
+            response = handler(environ, lambda s, headers, exc_info=None: status.append(int(s.split()[0])))
+            for _ in response:
+                pass
+            response.close()
+            return time.perf_counter() - started, status[0]
+
+        results = {}
+        with ThreadPoolExecutor(concurrency) as pool:  # like a threaded WSGI server with `concurrency` workers
+            for name, page in pages.items():
+                started = time.perf_counter()
+                samples = list(pool.map(fetch, [page] * requests))
+                results[name] = summarise(samples, time.perf_counter() - started)
+        return results
+
+    def run_asgi(self, pages, requests, concurrency):
+        handler = ASGIHandler()
+
+        async def fetch(page, slots):
+            path, query, cookie = page
+            status = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+                'root_path': '', 'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+            }
+            async with slots:
+                started = time.perf_counter()
+                await handler(scope, receive, send)
+                return time.perf_counter() - started, status[0]
+
+        async def run_page(page):
+            slots = asyncio.Semaphore(concurrency)  # like an ASGI server with `concurrency` open connections
+            started = time.perf_counter()
+            samples = await asyncio.gather(*(fetch(page, slots) for _ in range(requests)))
+            return summarise(samples, time.perf_counter() - started)
+
+        async def run_all():
+            return {name: await run_page(page) for name, page in pages.items()}
+
+        return asyncio.run(run_all())
+
+
+HOST = 'localhost'
+
+
+def delay_queries(seconds):
+    def wait(execute, sql, params, many, context):
+        time.sleep(seconds)  # releases the GIL, like waiting on a socket
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wait)
+
+    connection_created.connect(install, weak=False)
+
+
+def session_cookie(user):
+    # What the test client's force_login does: a stored session for the user
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def summarise(samples, elapsed):
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    centiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'throughput': len(samples) / elapsed,
+        'p50': centiles[49],
+        'p95': centiles[94],
+        'p99': centiles[98],
+        'max': latencies[-1],
+        'errors': sum(1 for _, status in samples if status != 200),
+    }
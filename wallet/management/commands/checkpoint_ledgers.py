@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from wallet.models import Wallet
+from wallet import checkpoints
+
+
+class Command(BaseCommand):
+    help = "Backfill ledger checkpoints so balance_at() only replays a short tail."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=checkpoints.CHECKPOINT_EVERY,
+                            help="Ledger entries between checkpoints")
+        parser.add_argument('--wallet', type=int, help="Only this wallet id")
+
+    def handle(self, *args, **options):
+        wallets = Wallet.objects.order_by('id')
+        if options['wallet']:
+            wallets = wallets.filter(pk=options['wallet'])
+
+        total = 0
+        for wallet in wallets.iterator(chunk_size=500):
+            total += checkpoints.backfill(wallet, every=options['every'])
+        self.stdout.write(self.style.SUCCESS(f"Created {total} checkpoint(s)."))
@@ -0,0 +1,35 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from wallet.models import Transaction, Ledger, FraudLog, LoginHistory
+
+
+class Command(BaseCommand):
+    help = "Print the EXPLAIN plan for each hot query so a missing index shows up as a scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallet', type=int, default=1, help="Wallet id to plug into the queries")
+        parser.add_argument('--user', type=int, default=1, help="User id to plug into the queries")
+
+    def handle(self, *args, **options):
+        wallet_id = options['wallet']
+        user_id = options['user']
+        since = timezone.now() - timedelta(minutes=10)
+
+        queries = [
+            ("fraud velocity check",
+             Transaction.objects.filter(wallet_id=wallet_id, created_at__gte=since)),
+            ("pending approval queue",
+             Transaction.objects.filter(status='PENDING').order_by('-created_at')),
+            ("wallet ledger",
+             Ledger.objects.filter(wallet_id=wallet_id).order_by('-timestamp')),
+            ("user fraud logs",
+             FraudLog.objects.filter(user_id=user_id).order_by('-flagged_at')),
+            ("open session on logout",
+             LoginHistory.objects.filter(user_id=user_id, session_key='x', logout_time__isnull=True)),
+        ]
+
+        for label, qs in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {label}"))
+            self.stdout.write(qs.explain())
+            self.stdout.write("")
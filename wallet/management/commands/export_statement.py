@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from wallet.models import Wallet
+from wallet import statements
+
+
+class Command(BaseCommand):
+    help = "Stream a wallet's ledger as CSV or NDJSON without loading it into memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('wallet', help="Wallet id or account number")
+        parser.add_argument('--from', dest='start', help="First day to include (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='end', help="Last day to include (YYYY-MM-DD)")
+        parser.add_argument('--format', choices=sorted(statements.FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write to (default: stdout)")
+
+    def handle(self, *args, **options):
+        key = options['wallet']
+        wallet = Wallet.objects.filter(account_number=key).first()
+        if wallet is None and key.isdigit():
+            wallet = Wallet.objects.filter(pk=int(key)).first()
+        if wallet is None:
+            raise CommandError(f"Wallet {key} not found.")
+
+        try:
+            start, end = statements.parse_range(options['start'], options['end'])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+        rows = statements.statement_rows(wallet, start, end)
+
+        chunks = statements.render(rows, options['format'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as out:
+                out.writelines(chunks)
+        else:
+            self.stdout.ending = ''
+            for chunk in chunks:
+                self.stdout.write(chunk)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from wallet import summary
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard summary rows from the raw tables, fixing any drift and folding each counter's slots into one row."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Only report counters that drifted, don't rewrite them")
+
+    def handle(self, *args, **options):
+        current = {(metric, key): (count, amount) for metric, key, count, amount in summary.counters()}
+        fresh = summary.compute() if options['check'] else summary.rebuild()
+        expected = {(row.metric, row.key): (row.count, row.amount) for row in fresh}
+
+        drifted = 0
+        for metric, key in sorted(set(current) | set(expected)):
+            have = current.get((metric, key), (0, 0))
+            want = expected.get((metric, key), (0, 0))
+            if have[0] != want[0] or have[1] != want[1]:
+                drifted += 1
+                self.stdout.write(f"{metric}[{key}]: {have[0]} / {have[1]} -> {want[0]} / {want[1]}")
+
+        if options['check']:
+            self.stdout.write(f"{drifted} counter(s) drifted.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(fresh)} summary row(s); {drifted} had drifted."))
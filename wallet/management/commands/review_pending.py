@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from wallet.models import CustomUser, Transaction
+from wallet import bulk
+
+
+class Command(BaseCommand):
+    help = "Approve or reject pending transactions in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['approve', 'reject'])
+        parser.add_argument('--manager', required=True, help="Username recorded as approver")
+        parser.add_argument('--ids', type=int, nargs='+', help="Transaction ids (default: every pending transaction)")
+        parser.add_argument('--batch-size', type=int, default=bulk.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            manager = CustomUser.objects.get(username=options['manager'], role='manager')
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No manager named {options['manager']!r}.")
+
+        tx_ids = options['ids'] or list(
+            Transaction.objects.filter(status='PENDING').order_by('id').values_list('id', flat=True)
+        )
+        process = bulk.approve if options['action'] == 'approve' else bulk.reject
+        started = time.monotonic()
+        result = process(tx_ids, manager, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+
+        for tx_id, reason in sorted(result.failed.items()):
+            self.stdout.write(f"#{tx_id}: {reason}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['action'].capitalize()}d {len(result.processed)} transaction(s) in {elapsed:.2f}s; "
+            f"{len(result.failed)} left pending."
+        ))
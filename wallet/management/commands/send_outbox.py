@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from wallet import alerts, outbox
+
+
+class Command(BaseCommand):
+    help = "Queue due fraud digests, then deliver queued emails in batches over one reused SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=outbox.MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting once the queue is empty")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            alerts.send_admin_digest()
+            sent, failed = outbox.drain(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} email(s); {total_failed} failed attempt(s)."))
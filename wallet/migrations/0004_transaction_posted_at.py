@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:00
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def mark_posted(apps, schema_editor):
+    # Transactions that already have ledger rows must not be posted again
+    Transaction = apps.get_model('wallet', 'Transaction')
+    Transaction.objects.filter(ledger__isnull=False).update(
+        posted_at=Coalesce('processed_at', 'created_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0003_loginhistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='posted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_posted, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0004_transaction_posted_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fraudlog',
+            index=models.Index(fields=['user', '-flagged_at'], name='fraud_user_flagged_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['wallet', '-timestamp'], name='ledger_wallet_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(condition=models.Q(('logout_time__isnull', True)), fields=['user', 'session_key'], name='login_open_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', 'created_at'], name='tx_wallet_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['-created_at'], name='tx_pending_created_idx'),
+        ),
+    ]
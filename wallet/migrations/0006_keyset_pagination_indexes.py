@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ledger',
+            name='ledger_wallet_ts_idx',
+        ),
+        migrations.AddIndex(
+            model_name='ledger',
+            index=models.Index(fields=['wallet', '-timestamp', '-id'], name='ledger_wallet_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-created_at', '-id'], name='tx_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0006_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wallet.ledger')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='wallet.wallet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['wallet', '-timestamp'], name='checkpoint_wallet_ts_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ledgercheckpoint',
+            constraint=models.UniqueConstraint(fields=('wallet', 'last_entry'), name='checkpoint_wallet_entry_uniq'),
+        ),
+    ]
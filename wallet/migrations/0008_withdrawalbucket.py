@@ -0,0 +1,49 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+from django.db.models import Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+def backfill_buckets(apps, schema_editor):
+    # Seed the buckets with the withdrawals the rolling checks can still see
+    Transaction = apps.get_model('wallet', 'Transaction')
+    WithdrawalBucket = apps.get_model('wallet', 'WithdrawalBucket')
+    recent = (
+        Transaction.objects
+        .filter(tx_type='WITHDRAW', status='APPROVED', processed_at__gte=timezone.now() - timedelta(hours=48))
+        .annotate(hour=TruncHour('processed_at'))
+        .values('wallet_id', 'hour')
+        .annotate(total=Sum('amount'))
+    )
+    WithdrawalBucket.objects.bulk_create([
+        WithdrawalBucket(wallet_id=row['wallet_id'], hour=row['hour'], total=row['total'])
+        for row in recent
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0007_ledgercheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WithdrawalBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='withdrawal_buckets', to='wallet.wallet')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='withdrawalbucket',
+            constraint=models.UniqueConstraint(fields=('wallet', 'hour'), name='withdrawal_bucket_wallet_hour_uniq'),
+        ),
+        migrations.RunPython(backfill_buckets, migrations.RunPython.noop),
+    ]
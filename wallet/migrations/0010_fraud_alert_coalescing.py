@@ -0,0 +1,35 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:11
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_digested(apps, schema_editor):
+    # Only alerts raised from now on go into digests
+    FraudLog = apps.get_model('wallet', 'FraudLog')
+    FraudLog.objects.update(digested_at=F('flagged_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0009_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='fraudlog',
+            name='digested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='fraudlog',
+            index=models.Index(condition=models.Q(('digested_at__isnull', True)), fields=['id'], name='fraud_undigested_idx'),
+        ),
+        migrations.RunPython(mark_existing_digested, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:14
+
+from django.db import migrations, models
+import django.utils.timezone
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# The pairs utils.get_conversion_rate used to hard-code
+LEGACY_RATES = [
+    ('INR', 'USD', '0.012'),
+    ('USD', 'INR', '83.0'),
+    ('INR', 'BTC', '0.0000003'),
+    ('BTC', 'INR', '3300000'),
+]
+
+
+def seed_rates(apps, schema_editor):
+    FxRate = apps.get_model('wallet', 'FxRate')
+    since = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    FxRate.objects.bulk_create([
+        FxRate(base=base, quote=quote, rate=Decimal(rate), effective_at=since)
+        for base, quote, rate in LEGACY_RATES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0010_fraud_alert_coalescing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(choices=[('INR', 'Indian Rupee'), ('USD', 'US Dollar'), ('EUR', 'Euro'), ('BTC', 'Bitcoin')], max_length=10)),
+                ('quote', models.CharField(choices=[('INR', 'Indian Rupee'), ('USD', 'US Dollar'), ('EUR', 'Euro'), ('BTC', 'Bitcoin')], max_length=10)),
+                ('rate', models.DecimalField(decimal_places=12, max_digits=30)),
+                ('effective_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['base', 'quote', 'effective_at'], name='fxrate_pair_effective_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='fxrate',
+            constraint=models.CheckConstraint(check=models.Q(('base', models.F('quote')), _negated=True), name='fxrate_distinct_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='fxrate',
+            constraint=models.CheckConstraint(check=models.Q(('rate__gt', 0)), name='fxrate_positive'),
+        ),
+        migrations.RunPython(seed_rates, migrations.RunPython.noop),
+    ]
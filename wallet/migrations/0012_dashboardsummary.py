@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+def build_summary(apps, schema_editor):
+    from wallet.summary import rebuild
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0011_fxrate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dashboardsummary',
+            constraint=models.UniqueConstraint(fields=('metric', 'key'), name='summary_metric_key_uniq'),
+        ),
+        migrations.RunPython(build_summary, migrations.RunPython.noop),
+    ]
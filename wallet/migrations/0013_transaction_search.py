@@ -0,0 +1,70 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+# User search backs the manager history "user" filter.
+# SQLite: an FTS5 index over the user table, kept in sync by triggers.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE wallet_customuser_fts USING fts5(username, email, first_name, last_name)",
+    "INSERT INTO wallet_customuser_fts(rowid, username, email, first_name, last_name) "
+    "SELECT id, username, email, first_name, last_name FROM wallet_customuser",
+    "CREATE TRIGGER wallet_customuser_fts_ai AFTER INSERT ON wallet_customuser BEGIN "
+    "INSERT INTO wallet_customuser_fts(rowid, username, email, first_name, last_name) "
+    "VALUES (new.id, new.username, new.email, new.first_name, new.last_name); END",
+    "CREATE TRIGGER wallet_customuser_fts_ad AFTER DELETE ON wallet_customuser BEGIN "
+    "DELETE FROM wallet_customuser_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER wallet_customuser_fts_au AFTER UPDATE OF username, email, first_name, last_name "
+    "ON wallet_customuser BEGIN "
+    "DELETE FROM wallet_customuser_fts WHERE rowid = old.id; "
+    "INSERT INTO wallet_customuser_fts(rowid, username, email, first_name, last_name) "
+    "VALUES (new.id, new.username, new.email, new.first_name, new.last_name); END",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS wallet_customuser_fts_au",
+    "DROP TRIGGER IF EXISTS wallet_customuser_fts_ad",
+    "DROP TRIGGER IF EXISTS wallet_customuser_fts_ai",
+    "DROP TABLE IF EXISTS wallet_customuser_fts",
+]
+# PostgreSQL: trigram indexes matching the UPPER(...) LIKE that icontains generates.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+] + [
+    f"CREATE INDEX IF NOT EXISTS user_{column}_trgm_idx ON wallet_customuser USING gin (UPPER({column}) gin_trgm_ops)"
+    for column in ('username', 'email', 'first_name', 'last_name')
+]
+POSTGRES_REVERSE = [
+    f"DROP INDEX IF EXISTS user_{column}_trgm_idx" for column in ('username', 'email', 'first_name', 'last_name')
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0012_dashboardsummary'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='tx_pending_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='tx_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['tx_type', '-created_at', '-id'], name='tx_type_created_idx'),
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0013_transaction_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(fields=['-login_time', '-id'], name='login_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0014_loginhistory_time_index'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dashboardsummary',
+            name='summary_metric_key_uniq',
+        ),
+        migrations.AddField(
+            model_name='dashboardsummary',
+            name='slot',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='dashboardsummary',
+            constraint=models.UniqueConstraint(fields=('metric', 'key', 'slot'), name='summary_metric_key_slot_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0015_dashboardsummary_slots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='entries_since_checkpoint',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-18 20:12
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def backfill_opening_balances(apps, schema_editor):
+    # The balance each wallet held before its first ledger entry; with no
+    # entries at all that is simply its current balance
+    Wallet = apps.get_model('wallet', 'Wallet')
+    Ledger = apps.get_model('wallet', 'Ledger')
+    first_ids = Ledger.objects.values('wallet_id').annotate(first_id=Min('id')).values_list('first_id', flat=True)
+    opening = {
+        wallet_id: balance_after - (amount if entry_type == 'credit' else -amount)
+        for wallet_id, entry_type, amount, balance_after in Ledger.objects.filter(id__in=first_ids).values_list(
+            'wallet_id', 'entry_type', 'amount', 'balance_after',
+        ).iterator()
+    }
+    changed = []
+    for wallet in Wallet.objects.only('id', 'balance').iterator():
+        wallet.opening_balance = opening.get(wallet.id, wallet.balance)
+        if wallet.opening_balance:
+            changed.append(wallet)
+        if len(changed) == 1000:
+            Wallet.objects.bulk_update(changed, ['opening_balance'])
+            changed = []
+    Wallet.objects.bulk_update(changed, ['opening_balance'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0016_wallet_entries_since_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_opening_balances, migrations.RunPython.noop),
+    ]
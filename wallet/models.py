@@ -1,8 +1,9 @@
 # models.py
 import uuid
 import pyotp
-from django.db import models
+from django.db import connection, models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from decimal import Decimal
 
@@ -52,13 +53,13 @@ class CustomUser(AbstractUser):
         self.save()
 
     def get_totp_uri(self):
-        return pyotp.totp.TOTP(self.totp_secret).provisioning_uri(
-            name=self.email,
-            issuer_name="MultiWalletApp"
-        )
+        from .otp import provisioning_uri
+        return provisioning_uri(self)
 
     def verify_otp(self, otp):
-        return pyotp.TOTP(self.totp_secret).verify(otp)
+        # Each code is accepted once; see wallet.otp.verify
+        from .otp import verify
+        return verify(self, otp)
 
 
 class Currency(models.Model):
@@ -80,31 +81,68 @@ class Wallet(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     currency = models.ForeignKey(Currency, on_delete=models.CASCADE)
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Balance the wallet was created with, before any ledger entry; the ledger replays from here
+    opening_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     frozen_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # ✅ NEW
     is_frozen = models.BooleanField(default=False)
+    entries_since_checkpoint = models.PositiveIntegerField(default=0)  # kept by the posting engine, see wallet.checkpoints
     account_number = models.CharField(max_length=20, unique=True, editable=False, null=False)
 
     def save(self, *args, **kwargs):
         if not self.account_number:
             import uuid
             self.account_number = str(uuid.uuid4().int)[0:16]
+        if self._state.adding:
+            self.opening_balance = self.balance
         super().save(*args, **kwargs)
 
     def freeze(self, amount):
-        self.frozen_amount += amount
-        self.is_frozen = True
-        self.save()
+        # Only touch the hold columns so a stale instance never writes back an old balance
+        Wallet.objects.filter(pk=self.pk).update(
+            frozen_amount=models.F('frozen_amount') + amount,
+            is_frozen=True,
+        )
+        self.refresh_from_db(fields=['frozen_amount', 'is_frozen'])
+        from .summary import bump
+        from .panels import touch
+        bump('frozen', self.currency_id, amount=amount)
+        touch(self.user_id)
 
     def unfreeze(self, amount):
-        self.frozen_amount = max(Decimal('0.00'), self.frozen_amount - amount)
-        if self.frozen_amount == 0:
-            self.is_frozen = False
-        self.save()
+        wallets = Wallet.objects.filter(pk=self.pk)
+        with transaction.atomic():
+            if connection.features.has_select_for_update:
+                wallets = wallets.select_for_update()
+            # The hold never goes below zero, so count only what it actually held
+            released = min(wallets.values_list('frozen_amount', flat=True).get(), Decimal(amount))
+            wallets.update(
+                is_frozen=models.Case(
+                    models.When(frozen_amount__gt=amount, then=models.Value(True)),
+                    default=models.Value(False),
+                ),
+                frozen_amount=Greatest(models.F('frozen_amount') - amount, models.Value(Decimal('0.00'))),
+            )
+            from .summary import bump
+            bump('frozen', self.currency_id, amount=-released)
+        self.refresh_from_db(fields=['frozen_amount', 'is_frozen'])
+        from .panels import touch
+        touch(self.user_id)
 
     @property
     def available_balance(self):
         return self.balance - self.frozen_amount  # ✅ For display purposes
 
+    def balance_at(self, ts):
+        # Start from the nearest checkpoint at or before ts and replay only the tail after it
+        checkpoint = self.checkpoints.filter(timestamp__lte=ts).order_by('-timestamp', '-last_entry_id').first()
+        tail = Ledger.objects.filter(wallet=self, timestamp__lte=ts)
+        if checkpoint:
+            base = checkpoint.balance
+            tail = tail.filter(id__gt=checkpoint.last_entry_id)
+        else:
+            base = self.opening_balance
+        return base + (tail.aggregate(net=ledger_net())['net'] or Decimal('0.00'))
+
     def __str__(self):
         return f"{self.user.username} - {self.currency.code}"
 
@@ -119,9 +157,21 @@ class Transaction(models.Model):
     status = models.CharField(max_length=10, choices=TRANSACTION_STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
+    posted_at = models.DateTimeField(null=True, blank=True, editable=False)  # set once balances + ledger are written
     approved_by = models.ForeignKey(CustomUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='approved_tx')
     note = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # fraud velocity check: wallet=..., created_at__gte=...
+            models.Index(fields=['wallet', 'created_at'], name='tx_wallet_created_idx'),
+            # manager history: newest first, keyset on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='tx_created_id_idx'),
+            # approval queue (status='PENDING') and manager history filtered by status / type, newest first
+            models.Index(fields=['status', '-created_at', '-id'], name='tx_status_created_idx'),
+            models.Index(fields=['tx_type', '-created_at', '-id'], name='tx_type_created_idx'),
+        ]
+
     def is_high_risk(self):
         return self.tx_type == 'WITHDRAW' and self.amount > 500000
 
@@ -136,14 +186,74 @@ class Ledger(models.Model):
     balance_after = models.DecimalField(max_digits=12, decimal_places=2)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['wallet', '-timestamp', '-id'], name='ledger_wallet_ts_id_idx'),
+        ]
+
+    @property
+    def signed_amount(self):
+        return self.amount if self.entry_type == 'credit' else -self.amount
+
     def __str__(self):
         return f"{self.wallet} - {self.entry_type} - {self.amount}"
 
+
+def ledger_net():
+    # Credits minus debits, for aggregate()/annotate() over Ledger rows
+    return models.Sum(
+        models.Case(
+            models.When(entry_type='credit', then=models.F('amount')),
+            default=-models.F('amount'),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        )
+    )
+
+
+class LedgerCheckpoint(models.Model):
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='checkpoints')
+    last_entry = models.ForeignKey(Ledger, on_delete=models.CASCADE, related_name='+')
+    timestamp = models.DateTimeField()  # timestamp of last_entry
+    balance = models.DecimalField(max_digits=12, decimal_places=2)  # balance right after last_entry
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'last_entry'], name='checkpoint_wallet_entry_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['wallet', '-timestamp'], name='checkpoint_wallet_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet} @ {self.timestamp:%Y-%m-%d %H:%M} = {self.balance}"
+
+class WithdrawalBucket(models.Model):
+    # Approved withdrawals per wallet per hour, kept up to date by the posting engine
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='withdrawal_buckets')
+    hour = models.DateTimeField()  # start of the hour
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'hour'], name='withdrawal_bucket_wallet_hour_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet} @ {self.hour:%Y-%m-%d %H}:00 = {self.total}"
+
 class FraudLog(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE)
     reason = models.TextField()
     flagged_at = models.DateTimeField(auto_now_add=True)
+    digested_at = models.DateTimeField(null=True, blank=True)  # included in an admin digest email
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-flagged_at'], name='fraud_user_flagged_idx'),
+            models.Index(fields=['id'], name='fraud_undigested_idx', condition=models.Q(digested_at__isnull=True)),
+        ]
 
     def __str__(self):
         return f"{self.user.username} flagged for {self.reason}"
@@ -155,6 +265,90 @@ class LoginHistory(models.Model):
     session_key = models.CharField(max_length=40)
     login_time = models.DateTimeField(default=timezone.now)
     logout_time = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # logout: only still-open sessions are ever updated
+            models.Index(fields=['user', 'session_key'], name='login_open_session_idx', condition=models.Q(logout_time__isnull=True)),
+            # manager login history: newest first, keyset on (login_time, id)
+            models.Index(fields=['-login_time', '-id'], name='login_time_id_idx'),
+        ]
+
     @property
     def timestamp(self):
          return self.logout_time or self.login_time
+
+
+class EmailOutbox(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    dedupe_key = models.CharField(max_length=100, null=True, blank=True, unique=True)  # at most one message per key
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    lease_token = models.UUIDField(null=True, blank=True, editable=False)  # the send_outbox run that last claimed it
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # worker: due messages only
+            models.Index(fields=['next_attempt_at'], name='outbox_due_idx', condition=models.Q(status='PENDING')),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.status})"
+
+
+class FxRate(models.Model):
+    """1 unit of ``base`` buys ``rate`` units of ``quote`` from ``effective_at`` on."""
+    base = models.CharField(max_length=10, choices=CURRENCY_CHOICES)
+    quote = models.CharField(max_length=10, choices=CURRENCY_CHOICES)
+    rate = models.DecimalField(max_digits=30, decimal_places=12)
+    effective_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # latest rate per pair / history of one pair
+            models.Index(fields=['base', 'quote', 'effective_at'], name='fxrate_pair_effective_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=~models.Q(base=models.F('quote')), name='fxrate_distinct_pair'),
+            models.CheckConstraint(check=models.Q(rate__gt=0), name='fxrate_positive'),
+        ]
+
+    def __str__(self):
+        return f"{self.base}/{self.quote} {self.rate} @ {self.effective_at:%Y-%m-%d %H:%M}"
+
+
+class DashboardSummary(models.Model):
+    """
+    Running totals for the manager dashboard, kept up to date by the posting
+    and approval paths (see wallet.summary). ``key`` is '' for plain counters,
+    a currency id for balance/frozen, or an ISO date for fraud flags per day.
+    Each counter is spread over ``slot`` rows that are summed on read.
+    """
+    metric = models.CharField(max_length=20)
+    key = models.CharField(max_length=20, blank=True, default='')
+    slot = models.PositiveSmallIntegerField(default=0)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'key', 'slot'], name='summary_metric_key_slot_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric}[{self.key}]#{self.slot} = {self.count} / {self.amount}"
@@ -0,0 +1,119 @@
+import logging
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, connection as db_connection, transaction as db_transaction
+from django.utils import timezone
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 30  # doubled after every failed attempt
+LEASE_SECONDS = 300  # a claimed batch is retried if its worker dies mid-send
+
+
+def enqueue(to_email, subject, message, from_email=None, dedupe_key=None):
+    """
+    Queue an email in the current DB transaction; the send_outbox worker delivers it.
+
+    With a ``dedupe_key`` only the first message for that key is queued and
+    later ones return None.
+    """
+    if not to_email:
+        return None
+    item = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or 'noreply@walletapp.com',
+        dedupe_key=dedupe_key,
+    )
+    if dedupe_key is None:
+        item.save()
+        return item
+    try:
+        with db_transaction.atomic():
+            item.save()
+    except IntegrityError:
+        return None
+    return item
+
+
+def enqueue_many(messages, from_email=None):
+    """Queue many (to_email, subject, message) tuples in one INSERT."""
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL or 'noreply@walletapp.com'
+    return EmailOutbox.objects.bulk_create([
+        EmailOutbox(to_email=to_email, subject=subject, body=message, from_email=from_email)
+        for to_email, subject, message in messages
+        if to_email
+    ])
+
+
+def claim(batch_size=BATCH_SIZE):
+    """
+    Lease a batch of due messages to this worker.
+
+    Pushing next_attempt_at forward is the lease, so concurrent workers skip
+    these rows without holding a DB transaction open while SMTP is slow.
+    The UPDATE only takes rows that are still due, and the worker sends just
+    the rows stamped with its own lease token: without SKIP LOCKED (SQLite)
+    two workers can read the same batch, but only one of them claims each row.
+    """
+    now = timezone.now()
+    token = uuid.uuid4()
+    with db_transaction.atomic():
+        due = EmailOutbox.objects.filter(status='PENDING', next_attempt_at__lte=now).order_by('next_attempt_at', 'id')
+        if db_connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        claimed = EmailOutbox.objects.filter(pk__in=ids, status='PENDING', next_attempt_at__lte=now).update(
+            next_attempt_at=now + timedelta(seconds=LEASE_SECONDS), lease_token=token,
+        )
+    if not claimed:
+        return []
+    return list(EmailOutbox.objects.filter(lease_token=token).order_by('id'))
+
+
+def drain(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """Send one batch over a single SMTP connection. Returns (sent, failed)."""
+    batch = claim(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent, retry = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+        for item in batch:
+            message = EmailMessage(item.subject, item.body, item.from_email, [item.to_email], connection=connection)
+            try:
+                if not connection.send_messages([message]):
+                    raise RuntimeError("backend accepted no messages")
+                sent.append(item.pk)
+            except Exception as e:
+                logger.warning("Email %s to %s failed: %s", item.pk, item.to_email, e)
+                item.last_error = str(e)
+                retry.append(item)
+    except Exception as e:
+        # Could not connect at all: everything not yet sent is retried
+        logger.warning("Email connection failed: %s", e)
+        done = set(sent) | {item.pk for item in retry}
+        for item in batch:
+            if item.pk not in done:
+                item.last_error = str(e)
+                retry.append(item)
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    EmailOutbox.objects.filter(pk__in=sent).update(status='SENT', sent_at=now, last_error='')
+    for item in retry:
+        item.attempts += 1
+        item.next_attempt_at = now + timedelta(seconds=BACKOFF_SECONDS * 2 ** (item.attempts - 1))
+        if item.attempts >= max_attempts:
+            item.status = 'FAILED'
+    EmailOutbox.objects.bulk_update(retry, ['attempts', 'next_attempt_at', 'status', 'last_error'])
+    return len(sent), len(retry)
@@ -0,0 +1,56 @@
+import base64
+from collections import namedtuple
+from datetime import datetime
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+KeysetPage = namedtuple('KeysetPage', ['object_list', 'next_cursor', 'prev_cursor'])
+
+
+def encode_cursor(value, pk):
+    raw = f"{value.isoformat() if isinstance(value, datetime) else value}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    try:
+        value, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return parse(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(queryset, field, after=None, before=None, size=PAGE_SIZE):
+    """
+    Newest-first page of ``queryset`` ordered by ``(field, id)``.
+
+    ``after`` continues to older rows, ``before`` goes back to newer ones.
+    Each page is a range scan on the (field, id) position instead of an
+    OFFSET, so it costs the same however deep into the history it is.
+    ``field`` is a datetime column, or ``'id'`` to page by primary key alone.
+    """
+    parse = int if field == 'id' else datetime.fromisoformat
+    after = decode_cursor(after, parse) if after else None
+    before = decode_cursor(before, parse) if before else None
+
+    if before:
+        value, pk = before
+        qs = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk}))
+        rows = list(qs.order_by(field, 'id')[:size + 1])
+        has_newer = len(rows) > size
+        rows = rows[:size][::-1]
+        has_older = True
+    else:
+        qs = queryset
+        if after:
+            value, pk = after
+            qs = qs.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+        rows = list(qs.order_by(f'-{field}', '-id')[:size + 1])
+        has_older = len(rows) > size
+        rows = rows[:size]
+        has_newer = after is not None
+
+    next_cursor = encode_cursor(getattr(rows[-1], field), rows[-1].pk) if rows and has_older else None
+    prev_cursor = encode_cursor(getattr(rows[0], field), rows[0].pk) if rows and has_newer else None
+    return KeysetPage(rows, next_cursor, prev_cursor)
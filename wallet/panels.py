@@ -0,0 +1,113 @@
+import logging
+import uuid
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+from django.template.loader import render_to_string
+from .models import FraudLog, Transaction
+from .utils import annotated_wallets
+from . import concurrency
+
+logger = logging.getLogger(__name__)
+
+PANEL_TTL = 60 * 60  # panels of superseded versions simply age out
+RECENT_TRANSACTIONS = 10
+FRAUD_LOGS_SHOWN = 20
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE', 'default')]
+
+
+def _version_key(user_id):
+    return f'dash:v:{user_id}'
+
+
+# --- what each panel shows (user, for rendering, plus its queryset) ---
+
+def _wallets(user):
+    return {'wallets': annotated_wallets(user)}
+
+
+def _transactions(user):
+    return {'transactions': Transaction.objects.filter(wallet__user=user)
+            .select_related('wallet__user', 'target_wallet__user').order_by('-created_at')[:RECENT_TRANSACTIONS]}
+
+
+def _fraud(user):
+    return {'fraud_logs': FraudLog.objects.filter(user=user).order_by('-flagged_at')[:FRAUD_LOGS_SHOWN]}
+
+
+PANELS = {
+    'wallets': ('dashboard/wallets.html', _wallets),
+    'transactions': ('dashboard/transactions.html', _transactions),
+    'fraud': ('dashboard/fraud.html', _fraud),
+}
+
+
+def render_panels(user):
+    """
+    The rendered dashboard panels for ``user`` as {name: html}.
+
+    Panels are cached under the user's current version, so a hit costs
+    two cache reads and no SQL. touch() moves the user to a new version
+    once a change that shows on the dashboard commits.
+    """
+    keys, found = _cached(user)
+    missing = {name: partial(_render, name, user) for name in PANELS if not keys or keys[name] not in found}
+    return _merge(keys, found, concurrency.run_all(missing))
+
+
+async def arender_panels(user):
+    """render_panels() for async views: panels that missed the cache are rendered concurrently."""
+    keys, found = await sync_to_async(_cached)(user)
+    missing = {name: partial(_render, name, user) for name in PANELS if not keys or keys[name] not in found}
+    if not missing:
+        return _merge(keys, found, {})  # nothing to store, so no cache call to move off the event loop
+    return await sync_to_async(_merge)(keys, found, await concurrency.gather(missing))
+
+
+def _cached(user):
+    cache = _cache()
+    try:
+        version = cache.get(_version_key(user.pk))
+        if version is None:
+            cache.add(_version_key(user.pk), uuid.uuid4().hex, None)
+            version = cache.get(_version_key(user.pk))
+        keys = {name: f'dash:{user.pk}:{version}:{name}' for name in PANELS}
+        return keys, cache.get_many(keys.values())
+    except Exception as e:
+        logger.warning("Dashboard cache unavailable: %s", e)
+        return None, {}
+
+
+def _render(name, user):
+    template, load = PANELS[name]
+    return render_to_string(template, {'user': user, **load(user)})
+
+
+def _merge(keys, found, rendered):
+    if keys and rendered:
+        try:
+            _cache().set_many({keys[name]: html for name, html in rendered.items()}, PANEL_TTL)
+        except Exception as e:
+            logger.warning("Dashboard cache unavailable: %s", e)
+    return {name: rendered[name] if name in rendered else found[keys[name]] for name in PANELS}
+
+
+def touch(*user_ids):
+    """Invalidate the cached dashboard of each user once the current DB transaction commits."""
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if user_ids:
+        db_transaction.on_commit(lambda: _bump(user_ids))
+
+
+def _bump(user_ids):
+    # A fresh random version, not a counter: a version key that was evicted
+    # can never come back as a value that old panels are stored under.
+    try:
+        _cache().set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+    except Exception as e:
+        logger.warning("Dashboard cache unavailable, panels stay stale for up to %ss: %s", PANEL_TTL, e)
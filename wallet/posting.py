@@ -0,0 +1,109 @@
+from decimal import Decimal
+from django.db import connection as db_connection, transaction as db_transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Transaction, Ledger, Wallet
+from . import checkpoints, limits, panels, summary
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def post(tx, release_hold=False):
+    """
+    Apply an approved transaction to wallet balances and write its ledger rows.
+
+    Balances are changed with conditional ``F()`` updates so concurrent postings
+    against the same wallet never overwrite each other. The transaction row is
+    claimed first (``posted_at``), which makes posting idempotent and, on SQLite,
+    takes the write lock before anything is read.
+
+    ``release_hold`` also releases the amount frozen when the transaction was
+    submitted for approval. Returns False if the transaction was already posted.
+    """
+    with db_transaction.atomic():
+        posted_at = timezone.now()
+        claimed = Transaction.objects.filter(pk=tx.pk, posted_at__isnull=True).update(posted_at=posted_at)
+        if not claimed:
+            return False
+        tx.posted_at = posted_at
+
+        legs = _legs(tx)
+        # Touch wallets in id order so two transfers between the same pair
+        # of wallets always lock rows in the same order.
+        for wallet, entry_type, amount in sorted(legs, key=lambda leg: leg[0].pk):
+            _apply(wallet, entry_type, amount, release_hold)
+
+        Ledger.objects.bulk_create([
+            Ledger(
+                transaction=tx,
+                wallet=wallet,
+                entry_type=entry_type,
+                amount=amount,
+                balance_after=wallet.balance,
+            )
+            for wallet, entry_type, amount in legs
+        ])
+        for wallet, _, _ in legs:
+            checkpoints.maybe_checkpoint(wallet)
+        if tx.tx_type == 'WITHDRAW':
+            limits.record_withdrawal(tx.wallet_id, tx.amount, posted_at)
+    return True
+
+
+def _legs(tx):
+    if tx.tx_type == 'DEPOSIT':
+        return [(tx.wallet, 'credit', tx.amount)]
+    if tx.tx_type == 'WITHDRAW':
+        return [(tx.wallet, 'debit', tx.amount)]
+    if tx.tx_type == 'TRANSFER':
+        legs = [(tx.wallet, 'debit', tx.amount)]
+        if tx.target_wallet_id:
+            legs.append((tx.target_wallet, 'credit', tx.converted_amount or tx.amount))
+        return legs
+    raise ValueError(f"Unknown transaction type: {tx.tx_type}")
+
+
+def _apply(wallet, entry_type, amount, release_hold):
+    amount = Decimal(amount)
+    wallets = Wallet.objects.filter(pk=wallet.pk)
+    changes = {}
+
+    if release_hold:
+        # The hold never goes below zero, so count only what it actually held
+        released = min(_frozen_amount(wallets), amount)
+        # is_frozen is listed first: MySQL evaluates SET left to right.
+        changes['is_frozen'] = Case(When(frozen_amount__gt=amount, then=Value(True)), default=Value(False))
+        changes['frozen_amount'] = Greatest(F('frozen_amount') - amount, Value(Decimal('0.00')))
+
+    # Counted in the same UPDATE, so deciding when to checkpoint needs no ledger scan
+    changes['entries_since_checkpoint'] = F('entries_since_checkpoint') + 1
+
+    if entry_type == 'debit':
+        changes['balance'] = F('balance') - amount
+        if not wallets.filter(balance__gte=amount).update(**changes):
+            raise InsufficientFunds(f"Insufficient balance in wallet {wallet.account_number}.")
+    else:
+        changes['balance'] = F('balance') + amount
+        wallets.update(**changes)
+
+    summary.bump('balance', wallet.currency_id, amount=amount if entry_type == 'credit' else -amount)
+    if release_hold:
+        summary.bump('frozen', wallet.currency_id, amount=-released)
+    panels.touch(wallet.user_id)
+
+    # The row stays locked until commit, so this read sees our own update.
+    current = wallets.values('balance', 'frozen_amount', 'is_frozen', 'entries_since_checkpoint').get()
+    wallet.balance = current['balance']
+    wallet.frozen_amount = current['frozen_amount']
+    wallet.is_frozen = current['is_frozen']
+    wallet.entries_since_checkpoint = current['entries_since_checkpoint']
+
+
+def _frozen_amount(wallets):
+    # Locked until commit, so the hold can't change between this read and the update
+    if db_connection.features.has_select_for_update:
+        wallets = wallets.select_for_update()
+    return wallets.values_list('frozen_amount', flat=True).get()
@@ -0,0 +1,64 @@
+from decimal import Decimal
+from django.db import connections
+from .models import Wallet, Ledger
+
+BATCH_SIZE = 5000  # ledger rows fetched per round trip
+
+
+def reconcile_wallet(wallet_id, balance, opening=Decimal('0.00'), batch_size=BATCH_SIZE):
+    """
+    Walk one wallet's ledger in id order and check the balance_after chain.
+
+    The chain starts from the wallet's recorded opening balance, never from
+    the entries being checked, so a balance change before the first entry
+    (or on a wallet with no entries at all) shows up as a mismatch.
+
+    Returns ``(entries_checked, mismatch)`` where mismatch is None when the
+    chain is unbroken and ends at the wallet's stored balance.
+    """
+    rows = Ledger.objects.filter(wallet_id=wallet_id).order_by('id').values_list(
+        'id', 'entry_type', 'amount', 'balance_after',
+    ).iterator(chunk_size=batch_size)
+
+    running = opening
+    count = 0
+    first_divergent = None
+    for entry_id, entry_type, amount, balance_after in rows:
+        running += amount if entry_type == 'credit' else -amount
+        count += 1
+        if first_divergent is None and balance_after != running:
+            first_divergent = {'entry_id': entry_id, 'expected': running, 'balance_after': balance_after}
+
+    if first_divergent is None and running == balance:
+        return count, None
+    return count, {
+        'wallet_id': wallet_id,
+        'balance': balance,
+        'opening': opening,
+        'ledger_balance': running,
+        'first_divergent': first_divergent,
+    }
+
+
+def reconcile_range(start_id, end_id, batch_size=BATCH_SIZE):
+    """Worker entry point: reconcile wallets with start_id <= id < end_id, return (wallets, entries, mismatches)."""
+    balances = (Wallet.objects.filter(id__gte=start_id, id__lt=end_id).order_by('id')
+                .values_list('id', 'balance', 'opening_balance'))
+    wallets = entries = 0
+    mismatches = []
+    for wallet_id, balance, opening in balances:
+        checked, mismatch = reconcile_wallet(wallet_id, balance, opening, batch_size)
+        wallets += 1
+        entries += checked
+        if mismatch:
+            mismatches.append(mismatch)
+    return wallets, entries, mismatches
+
+
+def init_worker():
+    # Forked workers must not share the parent's database sockets
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import re
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection as db_connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from .models import CustomUser, Wallet
+
+COUNT_CACHE_SECONDS = 60
+COUNT_LIMIT = 10000  # counting stops here; the page shows "10,000+"
+
+FTS_TABLE = 'wallet_customuser_fts'  # created by migration 0013 on SQLite
+
+
+def _cache():
+    return caches[getattr(settings, 'SEARCH_CACHE', 'default')]
+
+
+def user_ids_matching(text):
+    """
+    Ids of users whose username, name or email matches ``text``.
+
+    On SQLite this is a prefix search on the FTS5 index (every word must
+    match); elsewhere it is icontains, which PostgreSQL answers from the
+    trigram indexes.
+    """
+    if db_connection.vendor == 'sqlite':
+        words = re.findall(r'\w+', text)
+        if not words:
+            return CustomUser.objects.none().values('id')
+        match = ' '.join(f'"{word}"*' for word in words)
+        return CustomUser.objects.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        ).values('id')
+    matches = Q()
+    for field in ('username', 'email', 'first_name', 'last_name'):
+        matches |= Q(**{f'{field}__icontains': text})
+    return CustomUser.objects.filter(matches).values('id')
+
+
+def wallets_with_prefix(prefix):
+    # A range on the unique index instead of LIKE, which SQLite can't use an index for
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Wallet.objects.filter(account_number__gte=prefix, account_number__lt=upper).values('id')
+
+
+def filter_transactions(queryset, filters):
+    """Apply the cleaned TransactionSearchForm ``filters`` to a Transaction queryset."""
+    if filters.get('user'):
+        queryset = queryset.filter(wallet__user_id__in=user_ids_matching(filters['user']))
+    if filters.get('account'):
+        wallets = wallets_with_prefix(filters['account'])
+        queryset = queryset.filter(Q(wallet_id__in=wallets) | Q(target_wallet_id__in=wallets))
+    if filters.get('tx_type'):
+        queryset = queryset.filter(tx_type=filters['tx_type'])
+    if filters.get('status'):
+        queryset = queryset.filter(status=filters['status'])
+    if filters.get('min_amount') is not None:
+        queryset = queryset.filter(amount__gte=filters['min_amount'])
+    if filters.get('max_amount') is not None:
+        queryset = queryset.filter(amount__lte=filters['max_amount'])
+    if filters.get('date_from'):
+        queryset = queryset.filter(created_at__gte=_start_of(filters['date_from']))
+    if filters.get('date_to'):
+        queryset = queryset.filter(created_at__lt=_start_of(filters['date_to'] + timedelta(days=1)))
+    return queryset
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def count_matching(queryset, filters, limit=COUNT_LIMIT):
+    """
+    How many transactions match ``filters``, capped at ``limit`` and cached.
+
+    Returns (count, more) where ``more`` means there are over ``limit``.
+    The count is only a guide for the manager, so a minute of staleness is fine.
+    """
+    key = 'txcount:' + hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()
+    cached = _cache().get(key)
+    if cached is None:
+        n = queryset.order_by().values('id')[:limit + 1].count()
+        cached = (min(n, limit), n > limit)
+        _cache().set(key, cached, COUNT_CACHE_SECONDS)
+    return cached
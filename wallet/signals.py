@@ -1,75 +1,28 @@
-from django.db.models.signals import post_save
+import ipaddress
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
-from django.core.mail import send_mail
-from decimal import Decimal
-from datetime import timedelta
-from django.conf import settings
+from django.db import transaction as db_transaction
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-from .models import Transaction, Ledger, FraudLog, Wallet, LoginHistory
-
-# Constants
-FRAUD_AMOUNT_LIMIT = Decimal('500000')  # ₹5,00,000
-FRAUD_TXN_COUNT = 3
-FRAUD_TIME_WINDOW_MINUTES = 10
-ADMIN_EMAIL = "admin@walletapp.com"
+from .models import CustomUser, Transaction, FxRate, Wallet, FraudLog
+from . import alerts, events, fraud, fx, loginlog, outbox, panels, posting, summary, velocity
+from .fraud import FRAUD_TIME_WINDOW_MINUTES
 
 
 @receiver(post_save, sender=Transaction)
 def handle_transaction_save(sender, instance, created, **kwargs):
+    if created:
+        # Counted once committed; a rolled-back insert must not count towards velocity
+        db_transaction.on_commit(lambda: velocity.record(instance.wallet_id, FRAUD_TIME_WINDOW_MINUTES))
+    panels.touch(instance.wallet.user_id)  # recent transactions panel
+
     if created and instance.status == 'PENDING':
+        summary.bump('pending', count=1)
+        events.transaction_created(instance)
         return
 
     # ✅ Process approved transactions and update balances
-    if instance.status == 'APPROVED' and not Ledger.objects.filter(transaction=instance).exists():
-        if instance.tx_type == 'DEPOSIT':
-            instance.wallet.balance += instance.amount
-            instance.wallet.save()
-
-            Ledger.objects.create(
-                transaction=instance,
-                wallet=instance.wallet,
-                entry_type='credit',
-                amount=instance.amount,
-                balance_after=instance.wallet.balance
-            )
-
-        elif instance.tx_type == 'WITHDRAW':
-            instance.wallet.balance -= instance.amount
-            instance.wallet.save()
-
-            Ledger.objects.create(
-                transaction=instance,
-                wallet=instance.wallet,
-                entry_type='debit',
-                amount=instance.amount,
-                balance_after=instance.wallet.balance
-            )
-
-        elif instance.tx_type == 'TRANSFER':
-            instance.wallet.balance -= instance.amount
-            instance.wallet.save()
-
-            Ledger.objects.create(
-                transaction=instance,
-                wallet=instance.wallet,
-                entry_type='debit',
-                amount=instance.amount,
-                balance_after=instance.wallet.balance
-            )
-
-            if instance.target_wallet:
-                instance.target_wallet.balance += instance.converted_amount or instance.amount
-                instance.target_wallet.save()
-
-                Ledger.objects.create(
-                    transaction=instance,
-                    wallet=instance.target_wallet,
-                    entry_type='credit',
-                    amount=instance.converted_amount or instance.amount,
-                    balance_after=instance.target_wallet.balance
-                )
-
+    if instance.status == 'APPROVED' and instance.posted_at is None and posting.post(instance):
         # ✅ Send approval email
         subject = f"{instance.tx_type.capitalize()} Approved"
         message = (
@@ -96,10 +49,8 @@ def handle_transaction_save(sender, instance, created, **kwargs):
             send_email_notification(instance.target_wallet.user.email, subject2, message2)
 
     # ✅ Handle rejected transactions
+    # Pending transactions never touched the balance, only the hold (released by the view)
     if instance.status == 'REJECTED':
-        instance.wallet.balance += instance.amount
-        instance.wallet.save()
-
         subject = f"{instance.tx_type.capitalize()} Rejected"
         message = (
             f"⚠️ Your {instance.tx_type.lower()} request has been rejected.\n\n"
@@ -111,93 +62,87 @@ def handle_transaction_save(sender, instance, created, **kwargs):
         )
         send_email_notification(instance.wallet.user.email, subject, message)
 
-    # ✅ Fraud checks — high-value
-    if instance.amount >= FRAUD_AMOUNT_LIMIT:
-        log, created = FraudLog.objects.get_or_create(
-            user=instance.wallet.user,
-            transaction=instance,
-            reason=f"⚠️ High-value transaction over ₹{FRAUD_AMOUNT_LIMIT}"
-        )
-        if created:
-            subject = "⚠️ Fraud Alert: High-Value Transaction"
-            message = (
-                f"A suspicious transaction was flagged on your wallet.\n\n"
-                f"Transaction ID: {instance.id}\n"
-                f"Amount: ₹{instance.amount}\n"
-                f"Date: {instance.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                f"Reason: {log.reason}\n\n"
-                f"If this wasn't you, please contact support."
-            )
-            send_email_notification(instance.wallet.user.email, subject, message)
-            send_email_notification(ADMIN_EMAIL, subject, message)
-
-    # ✅ Fraud checks — rapid multiple transactions
-    time_window = timezone.now() - timedelta(minutes=FRAUD_TIME_WINDOW_MINUTES)
-    tx_count = Transaction.objects.filter(
-        wallet=instance.wallet,
-        created_at__gte=time_window
-    ).count()
-
-    if tx_count >= FRAUD_TXN_COUNT:
-        log, created = FraudLog.objects.get_or_create(
-            user=instance.wallet.user,
-            transaction=instance,
-            reason=f"⚠️ {tx_count} transactions within {FRAUD_TIME_WINDOW_MINUTES} minutes"
-        )
-        if created:
-            subject = "⚠️ Fraud Alert: Suspicious Transaction Pattern"
-            message = (
-                f"Multiple transactions were detected in a short time window.\n\n"
-                f"User: {instance.wallet.user.username}\n"
-                f"Count: {tx_count} transactions\n"
-                f"Time Frame: {FRAUD_TIME_WINDOW_MINUTES} minutes\n"
-                f"Latest Tx ID: {instance.id}\n\n"
-                f"If this activity seems suspicious, please review immediately."
-            )
-            send_email_notification(instance.wallet.user.email, subject, message)
-            send_email_notification(ADMIN_EMAIL, subject, message)
+    # ✅ Fraud checks — every rule registered in wallet.fraud
+    # The admin hears about hits through the periodic digest (alerts.send_admin_digest)
+    for hit in fraud.check_transaction(instance, created=created):
+        if hit.rule.subject:
+            alerts.notify_user(instance, hit)
 
 
 def send_email_notification(to_email, subject, message):
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL or 'noreply@walletapp.com',
-            recipient_list=[to_email],
-            fail_silently=True
-        )
-    except Exception as e:
-        print(f"[Email Error] {e}")
+    # Queued in the current DB transaction; `manage.py send_outbox` delivers it
+    outbox.enqueue(to_email, subject, message)
+
+
+@receiver(post_save, sender=Wallet)
+def count_new_wallet(sender, instance, created, **kwargs):
+    if created:
+        summary.bump('wallets', count=1)
+        summary.bump('balance', instance.currency_id, amount=instance.balance)
+        summary.bump('frozen', instance.currency_id, amount=instance.frozen_amount)
+    panels.touch(instance.user_id)
+
+
+@receiver(post_delete, sender=Wallet)
+def count_deleted_wallet(sender, instance, **kwargs):
+    summary.bump('wallets', count=-1)
+    summary.bump('balance', instance.currency_id, amount=-instance.balance)
+    summary.bump('frozen', instance.currency_id, amount=-instance.frozen_amount)
+    panels.touch(instance.user_id)
+
+
+@receiver(post_save, sender=FraudLog)
+@receiver(post_delete, sender=FraudLog)
+def refresh_fraud_panel(sender, instance, **kwargs):
+    # Logs from the fraud rules are bulk-created and touch the panel themselves
+    panels.touch(instance.user_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def count_new_customer(sender, instance, created, **kwargs):
+    if created and instance.role == 'user':
+        summary.bump('customers', count=1)
+
+
+@receiver(post_delete, sender=CustomUser)
+def count_deleted_customer(sender, instance, **kwargs):
+    if instance.role == 'user':
+        summary.bump('customers', count=-1)
+
+
+@receiver(post_save, sender=FxRate)
+@receiver(post_delete, sender=FxRate)
+def refresh_fx_rates(sender, **kwargs):
+    # Rebuild the shared rate matrix once the new rate is visible to everyone
+    db_transaction.on_commit(fx.rates.invalidate)
 
 
 @receiver(user_logged_in)
 def log_login(sender, request, user, **kwargs):
-    if not request.session.session_key:
-        request.session.save()
-    session_key = request.session.session_key or "N/A"
-
-    LoginHistory.objects.create(
+    # Buffered and bulk-written by wallet.loginlog, off the request path. The session
+    # key is filled in at flush time if the session hasn't been saved yet.
+    loginlog.record_login(
         user=user,
         ip_address=get_client_ip(request),
         user_agent=request.META.get('HTTP_USER_AGENT', ''),
-        session_key=session_key,
+        session_key=request.session.session_key,
+        session=request.session,
     )
 
 
 @receiver(user_logged_out)
 def log_logout(sender, request, user, **kwargs):
     session_key = request.session.session_key
-    if session_key:
-        LoginHistory.objects.filter(
-            user=user,
-            session_key=session_key,
-            logout_time__isnull=True
-        ).update(logout_time=timezone.now())
+    if session_key and user is not None:
+        loginlog.record_logout(user.pk, session_key, timezone.now())
 
 
 def get_client_ip(request):
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        return x_forwarded_for.split(',')[0]
-    return request.META.get('REMOTE_ADDR')
+    # X-Forwarded-For comes from the client: only trust it if it holds an IP address
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    for candidate in (x_forwarded_for.split(',')[0].strip(), request.META.get('REMOTE_ADDR', '')):
+        try:
+            return str(ipaddress.ip_address(candidate))
+        except ValueError:
+            continue
+    return '0.0.0.0'
@@ -0,0 +1,70 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import Ledger
+
+CHUNK_SIZE = 2000
+
+COLUMNS = ['entry_id', 'timestamp', 'tx_id', 'tx_type', 'entry_type', 'amount', 'balance_after']
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_range(start, end):
+    # Dates are inclusive whole days in the current timezone; raises ValueError for a bad date
+    start_date = _parse_day(start) if start else None
+    end_date = _parse_day(end) if end else None
+    start_ts = timezone.make_aware(datetime.combine(start_date, time.min)) if start_date else None
+    end_ts = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)) if end_date else None
+    return start_ts, end_ts
+
+
+def _parse_day(value):
+    day = parse_date(value)  # None if not YYYY-MM-DD, ValueError if not a real date
+    if day is None:
+        raise ValueError(f"{value!r} is not a date (YYYY-MM-DD).")
+    return day
+
+
+def statement_rows(wallet, start=None, end=None):
+    """Yield ledger rows as plain tuples, oldest first, a chunk at a time."""
+    entries = Ledger.objects.filter(wallet=wallet)
+    if start:
+        entries = entries.filter(timestamp__gte=start)
+    if end:
+        entries = entries.filter(timestamp__lt=end)
+    # values_list + iterator: no model instances and no result cache, so
+    # memory stays flat however many rows the wallet has.
+    return entries.order_by('timestamp', 'id').values_list(
+        'id', 'timestamp', 'transaction_id', 'transaction__tx_type', 'entry_type', 'amount', 'balance_after',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[0], row[1].isoformat(), *row[2:]])
+
+
+def render_ndjson(rows):
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        record['timestamp'] = record['timestamp'].isoformat()
+        record['amount'] = str(record['amount'])
+        record['balance_after'] = str(record['balance_after'])
+        yield json.dumps(record) + "\n"
+
+
+def render(rows, fmt):
+    return render_csv(rows) if fmt == 'csv' else render_ndjson(rows)
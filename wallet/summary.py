@@ -0,0 +1,104 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Currency, DashboardSummary
+
+FRAUD_DAYS_SHOWN = 14
+SLOTS = 16  # rows per counter: concurrent postings update different rows instead of queueing on one
+
+
+def bump(metric, key='', count=0, amount=0):
+    """Add to one summary counter in the caller's DB transaction."""
+    key = str(key)
+    slot = random.randrange(SLOTS)
+    row = DashboardSummary.objects.filter(metric=metric, key=key, slot=slot)
+    changes = {'count': F('count') + count, 'amount': F('amount') + Decimal(amount), 'updated_at': timezone.now()}
+    if row.update(**changes):
+        return
+    try:
+        with db_transaction.atomic():
+            DashboardSummary.objects.create(metric=metric, key=key, slot=slot, count=count, amount=Decimal(amount))
+    except IntegrityError:
+        # Another transaction created the counter first
+        row.update(**changes)
+
+
+def fraud_flagged(logs):
+    """Count newly created FraudLog rows, in total and per day."""
+    if not logs:
+        return
+    bump('fraud', count=len(logs))
+    per_day = {}
+    for log in logs:
+        day = timezone.localdate(log.flagged_at).isoformat()
+        per_day[day] = per_day.get(day, 0) + 1
+    for day, n in sorted(per_day.items()):
+        bump('fraud_day', day, count=n)
+
+
+def counters(rows=None):
+    """(metric, key, count, amount) for each counter, its slots summed."""
+    rows = DashboardSummary.objects.all() if rows is None else rows
+    return rows.order_by().values('metric', 'key').annotate(
+        total_count=Sum('count'), total_amount=Sum('amount'),
+    ).values_list('metric', 'key', 'total_count', 'total_amount')
+
+
+def snapshot():
+    """Everything the manager dashboard shows, read from the summary rows (two small queries)."""
+    since = (timezone.localdate() - timedelta(days=FRAUD_DAYS_SHOWN - 1)).isoformat()
+    rows = counters(DashboardSummary.objects.filter(~Q(metric='fraud_day') | Q(key__gte=since)))
+    codes = dict(Currency.objects.values_list('id', 'code'))
+
+    summary = {'pending': 0, 'customers': 0, 'wallets': 0, 'fraud': 0, 'currencies': {}, 'fraud_by_day': {}}
+    for metric, key, count, amount in rows:
+        if metric in ('balance', 'frozen'):
+            totals = summary['currencies'].setdefault(codes.get(int(key), key), {'balance': Decimal('0.00'), 'frozen': Decimal('0.00')})
+            totals[metric] = amount
+        elif metric == 'fraud_day':
+            summary['fraud_by_day'][key] = count
+        else:
+            summary[metric] = count
+    summary['fraud_by_day'] = dict(sorted(summary['fraud_by_day'].items(), reverse=True))
+    return summary
+
+
+def compute(apps=global_apps):
+    """Summary rows recomputed from the raw tables (``apps`` lets migrations use historical models)."""
+    Wallet = apps.get_model('wallet', 'Wallet')
+    Transaction = apps.get_model('wallet', 'Transaction')
+    FraudLog = apps.get_model('wallet', 'FraudLog')
+    CustomUser = apps.get_model('wallet', 'CustomUser')
+    Summary = apps.get_model('wallet', 'DashboardSummary')
+
+    rows = [
+        Summary(metric='pending', count=Transaction.objects.filter(status='PENDING').count()),
+        Summary(metric='customers', count=CustomUser.objects.filter(role='user').count()),
+        Summary(metric='wallets', count=Wallet.objects.count()),
+        Summary(metric='fraud', count=FraudLog.objects.count()),
+    ]
+    per_currency = Wallet.objects.order_by().values('currency_id').annotate(
+        balance=Sum('balance'), frozen=Sum('frozen_amount'),
+    )
+    for row in per_currency:
+        rows.append(Summary(metric='balance', key=str(row['currency_id']), amount=row['balance']))
+        rows.append(Summary(metric='frozen', key=str(row['currency_id']), amount=row['frozen']))
+    per_day = FraudLog.objects.order_by().annotate(day=TruncDate('flagged_at')).values('day').annotate(n=Count('id'))
+    for row in per_day:
+        rows.append(Summary(metric='fraud_day', key=row['day'].isoformat(), count=row['n']))
+    return rows
+
+
+def rebuild(apps=global_apps):
+    """Replace every summary row with freshly computed totals, correcting any drift."""
+    Summary = apps.get_model('wallet', 'DashboardSummary')
+    with db_transaction.atomic():
+        rows = compute(apps)
+        Summary.objects.all().delete()
+        Summary.objects.bulk_create(rows)
+    return rows
@@ -1,3 +1,1197 @@
-from django.test import TestCase
+import asyncio
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
+import json
+import numpy as np
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from .models import CustomUser, Currency, Wallet, Transaction, Ledger, LedgerCheckpoint, FraudLog, WithdrawalBucket, EmailOutbox, FxRate, DashboardSummary, LoginHistory
+from . import alerts, backtest, bulk, checkpoints, concurrency, events, fraud, fx, limits, loginlog, otp, outbox, panels, posting, reconciliation, search, summary, throttle, utils, valuation, views
+from .pagination import keyset_page
 
-# Create your tests here.
+
+def make_wallet(username, code='INR', balance='0.00'):
+    user = CustomUser.objects.create_user(username=username, email=f'{username}@example.com', password='pass12345')
+    currency, _ = Currency.objects.get_or_create(code=code)
+    return Wallet.objects.create(user=user, currency=currency, balance=Decimal(balance))
+
+
+def login(client, user):
+    # The test client's login request carries no REMOTE_ADDR for LoginHistory
+    with mock.patch('wallet.signals.get_client_ip', return_value='127.0.0.1'):
+        client.force_login(user)
+
+
+def approved(wallet, tx_type, amount, **kwargs):
+    return Transaction.objects.create(
+        wallet=wallet, tx_type=tx_type, amount=Decimal(amount),
+        status='APPROVED', processed_at=timezone.now(), **kwargs
+    )
+
+
+class PostingTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet('alice', balance='1000.00')
+
+    def test_deposit_and_withdraw_write_ledger(self):
+        approved(self.wallet, 'DEPOSIT', '250.00')
+        approved(self.wallet, 'WITHDRAW', '100.00')
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('1150.00'))
+        entries = list(Ledger.objects.filter(wallet=self.wallet).order_by('id'))
+        self.assertEqual([e.entry_type for e in entries], ['credit', 'debit'])
+        self.assertEqual(entries[-1].balance_after, Decimal('1150.00'))
+
+    def test_transfer_posts_both_legs_once(self):
+        target = make_wallet('bob')
+        tx = approved(self.wallet, 'TRANSFER', '300.00', target_wallet=target, converted_amount=Decimal('300.00'))
+
+        # Saving again (e.g. a note edit) must not post a second time
+        tx.note = 'edited'
+        tx.save()
+        self.assertFalse(posting.post(tx))
+
+        self.wallet.refresh_from_db()
+        target.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('700.00'))
+        self.assertEqual(target.balance, Decimal('300.00'))
+        self.assertEqual(Ledger.objects.filter(transaction=tx).count(), 2)
+
+    def test_stale_wallet_instances_do_not_lose_updates(self):
+        stale_a = Wallet.objects.get(pk=self.wallet.pk)
+        stale_b = Wallet.objects.get(pk=self.wallet.pk)
+        approved(stale_a, 'DEPOSIT', '10.00')
+        approved(stale_b, 'DEPOSIT', '20.00')
+        stale_a.freeze(Decimal('5.00'))
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('1030.00'))
+        self.assertEqual(self.wallet.frozen_amount, Decimal('5.00'))
+
+    def test_insufficient_funds_rolls_back(self):
+        with self.assertRaises(posting.InsufficientFunds):
+            approved(self.wallet, 'WITHDRAW', '5000.00')
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('1000.00'))
+        self.assertFalse(Ledger.objects.exists())
+
+    def test_release_hold_on_approval(self):
+        self.wallet.freeze(Decimal('200000.00'))
+        tx = Transaction.objects.create(wallet=self.wallet, tx_type='DEPOSIT', amount=Decimal('200000.00'))
+        tx.status = 'APPROVED'
+        self.assertTrue(posting.post(tx, release_hold=True))
+        tx.save()
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('201000.00'))
+        self.assertEqual(self.wallet.frozen_amount, Decimal('0.00'))
+        self.assertFalse(self.wallet.is_frozen)
+        self.assertEqual(Ledger.objects.filter(transaction=tx).count(), 1)
+
+
+class ConcurrentPostingTests(TransactionTestCase):
+    THREADS = 8
+    POSTS_PER_THREAD = 10
+
+    def setUp(self):
+        # Shared-cache in-memory SQLite fails fast on lock contention instead of waiting
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("needs a file-backed test database")
+
+    def test_concurrent_postings_do_not_drift(self):
+        wallet = make_wallet('merchant', balance='1000.00')
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(self.POSTS_PER_THREAD):
+                    approved(wallet, 'DEPOSIT', '3.00')
+                    approved(wallet, 'WITHDRAW', '1.00')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        wallet.refresh_from_db()
+        expected = Decimal('1000.00') + Decimal('2.00') * self.THREADS * self.POSTS_PER_THREAD
+        self.assertEqual(wallet.balance, expected)
+
+        # The balance_after chain must add up with no gaps
+        running = Decimal('1000.00')
+        for entry in Ledger.objects.filter(wallet=wallet).order_by('id'):
+            running += entry.amount if entry.entry_type == 'credit' else -entry.amount
+            self.assertEqual(entry.balance_after, running)
+        self.assertEqual(running, expected)
+
+
+class HotQueryPlanTests(TestCase):
+    def test_hot_queries_use_their_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("plan text is backend specific")
+        out = StringIO()
+        call_command('explain_hot_queries', stdout=out)
+        plans = out.getvalue()
+        for index in ['tx_wallet_created_idx', 'tx_status_created_idx', 'ledger_wallet_ts_id_idx',
+                      'fraud_user_flagged_idx', 'login_open_session_idx']:
+            self.assertIn(index, plans)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet('carol', balance='0.00')
+        for _ in range(7):
+            approved(self.wallet, 'DEPOSIT', '1.00')
+
+    def test_walks_forward_and_back_without_overlap(self):
+        ledger = Ledger.objects.filter(wallet=self.wallet)
+        expected = list(ledger.order_by('-timestamp', '-id'))
+
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(ledger, 'timestamp', after=cursor, size=3)
+            seen.extend(page.object_list)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+        back = keyset_page(ledger, 'timestamp', before=page.prev_cursor, size=3)
+        self.assertEqual(back.object_list, expected[3:6])
+
+    def test_manager_history_query_count_is_constant(self):
+        manager = CustomUser.objects.create_user(username='boss', password='pass12345', is_staff=True)
+        login(self.client, manager)
+        cache.clear()
+        with self.assertNumQueries(4):  # session, user, page, capped count
+            self.client.get(reverse('manager_transaction_history'))
+        with self.assertNumQueries(3):  # count now comes from the cache
+            self.client.get(reverse('manager_transaction_history'))
+
+
+class TransactionSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_wallet('alice', balance='100.00')
+        self.bob = make_wallet('bob', balance='100.00')
+        self.alice.user.first_name = 'Alice'
+        self.alice.user.last_name = 'Liddell'
+        self.alice.user.save()
+        self.deposit = approved(self.alice, 'DEPOSIT', '50.00')
+        self.withdraw = approved(self.alice, 'WITHDRAW', '5.00')
+        self.transfer = Transaction.objects.create(wallet=self.bob, target_wallet=self.alice, tx_type='TRANSFER', amount=Decimal('20.00'))
+        self.manager = CustomUser.objects.create_user(username='boss', password='pass12345', is_staff=True)
+        login(self.client, self.manager)
+
+    def search(self, **params):
+        response = self.client.get(reverse('manager_transaction_history'), params)
+        self.assertEqual(response.status_code, 200)
+        return {tx.pk for tx in response.context['transactions']}
+
+    def test_user_text_matches_name_and_email_prefixes(self):
+        self.assertEqual(search.user_ids_matching('lidd').get()['id'], self.alice.user_id)
+        self.assertEqual(self.search(user='alice@example'), {self.deposit.pk, self.withdraw.pk})
+        self.assertEqual(self.search(user='Alice Lidd'), {self.deposit.pk, self.withdraw.pk})
+        self.assertEqual(self.search(user='nobody'), set())
+
+    def test_search_index_follows_user_changes(self):
+        self.bob.user.username = 'robert'
+        self.bob.user.save()
+        self.assertEqual(self.search(user='robert'), {self.transfer.pk})
+
+    def test_account_prefix_matches_either_side(self):
+        prefix = self.alice.account_number[:6]
+        self.assertEqual(self.search(account=prefix), {self.deposit.pk, self.withdraw.pk, self.transfer.pk})
+
+    def test_type_status_amount_and_date_filters(self):
+        self.assertEqual(self.search(tx_type='WITHDRAW'), {self.withdraw.pk})
+        self.assertEqual(self.search(status='PENDING'), {self.transfer.pk})
+        self.assertEqual(self.search(min_amount='10', max_amount='30'), {self.transfer.pk})
+        today = timezone.localdate()
+        self.assertEqual(len(self.search(date_from=today.isoformat(), date_to=today.isoformat())), 3)
+        self.assertEqual(self.search(date_to=(today - timedelta(days=1)).isoformat()), set())
+
+    def test_invalid_range_is_reported(self):
+        response = self.client.get(reverse('manager_transaction_history'), {'min_amount': '10', 'max_amount': '1'})
+        self.assertContains(response, 'Min amount is above max amount.')
+
+    def test_count_is_capped_and_cached(self):
+        approved_qs = search.filter_transactions(Transaction.objects.all(), {'status': 'APPROVED'})
+        self.assertEqual(search.count_matching(approved_qs, {'status': 'APPROVED'}), (2, False))
+        approved(self.bob, 'DEPOSIT', '1.00')
+        self.assertEqual(search.count_matching(approved_qs, {'status': 'APPROVED'}), (2, False))  # cached
+        pending_qs = search.filter_transactions(Transaction.objects.all(), {'status': 'PENDING'})
+        self.assertEqual(search.count_matching(pending_qs, {'status': 'PENDING'}, limit=0), (0, True))
+
+    def test_pagination_keeps_filters(self):
+        for _ in range(55):
+            approved(self.bob, 'DEPOSIT', '1.00')
+        response = self.client.get(reverse('manager_transaction_history'), {'user': 'bob', 'tx_type': 'DEPOSIT'})
+        self.assertEqual(response.context['count'], 55)
+        self.assertContains(response, '?user=bob&amp;tx_type=DEPOSIT&after=')
+        older = self.client.get(reverse('manager_transaction_history'), {
+            'user': 'bob', 'tx_type': 'DEPOSIT', 'after': response.context['page'].next_cursor,
+        })
+        self.assertEqual(len(older.context['transactions']), 5)
+
+
+class DashboardPanelTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wallet = make_wallet('erin', balance='100.00')
+        self.other = make_wallet('frank', balance='100.00')
+        login(self.client, self.wallet.user)
+
+    def dashboard(self):
+        response = self.client.get(reverse('dashboard_view'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeat_hits_run_no_panel_queries(self):
+        self.dashboard()
+        with self.assertNumQueries(2):  # session and user only
+            self.dashboard()
+
+    def test_ledger_post_invalidates_owner_only(self):
+        self.assertContains(self.dashboard(), '₹100.00')
+        other_version = cache.get(panels._version_key(self.other.user_id))
+        with self.captureOnCommitCallbacks(execute=True):
+            approved(self.wallet, 'DEPOSIT', '25.00')
+        response = self.dashboard()
+        self.assertContains(response, '₹125.00')
+        self.assertContains(response, 'DEPOSIT')
+        self.assertEqual(cache.get(panels._version_key(self.other.user_id)), other_version)
+
+    def test_freeze_and_fraud_log_invalidate(self):
+        self.dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.wallet.freeze(Decimal('30.00'))
+        self.assertContains(self.dashboard(), 'Frozen Amount: ₹30.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            tx = approved(self.wallet, 'DEPOSIT', '1.00')
+            FraudLog.objects.create(user=self.wallet.user, transaction=tx, reason='Manual review')
+        self.assertContains(self.dashboard(), 'Manual review')
+
+    def test_uncommitted_change_does_not_invalidate(self):
+        self.dashboard()
+        version = cache.get(panels._version_key(self.wallet.user_id))
+        with self.captureOnCommitCallbacks(execute=False):
+            self.wallet.freeze(Decimal('30.00'))
+        self.assertEqual(cache.get(panels._version_key(self.wallet.user_id)), version)
+
+
+class RequestWalletsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wallet = make_wallet('gina', balance='100.00')
+        self.user = self.wallet.user
+        login(self.client, self.user)
+
+    def add_wallets(self, n):
+        for code in ['USD', 'EUR', 'GBP', 'JPY', 'AUD'][:n]:
+            currency, _ = Currency.objects.get_or_create(code=code)
+            Wallet.objects.create(user=self.user, currency=currency, balance=Decimal('10.00'))
+
+    def test_annotations(self):
+        sender = make_wallet('hank', balance='100.00')
+        Transaction.objects.create(wallet=self.wallet, tx_type='WITHDRAW', amount=Decimal('30.00'))
+        Transaction.objects.create(wallet=self.wallet, tx_type='WITHDRAW', amount=Decimal('5.00'))
+        incoming = Transaction.objects.create(wallet=sender, target_wallet=self.wallet, tx_type='TRANSFER', amount=Decimal('1.00'))
+        self.wallet.freeze(Decimal('35.00'))
+
+        wallet = utils.annotated_wallets(self.user).get()
+        self.assertEqual(wallet.available, Decimal('65.00'))
+        self.assertEqual(wallet.pending_holds, Decimal('35.00'))
+        self.assertEqual(wallet.last_activity, incoming.created_at)
+
+    def queries(self, name, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse(name), data) if data else self.client.get(reverse(name))
+        self.assertIn(response.status_code, (200, 302))
+        return len(ctx.captured_queries)
+
+    def test_form_pages_cost_the_same_for_any_number_of_wallets(self):
+        before = [self.queries(name) for name in ('deposit_view', 'withdraw_view', 'transfer_view')]
+        self.add_wallets(4)
+        after = [self.queries(name) for name in ('deposit_view', 'withdraw_view', 'transfer_view')]
+        self.assertEqual(before, after)
+        self.assertLessEqual(max(after), 4)  # session, user, wallets (+ transfer targets)
+
+    def test_form_validates_against_preloaded_wallets(self):
+        other = make_wallet('ivan', balance='100.00')
+        response = self.client.post(reverse('withdraw_view'), {'wallet': other.pk, 'amount': '1.00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('wallet', response.context['form'].errors)
+
+        self.client.post(reverse('withdraw_view'), {'wallet': self.wallet.pk, 'amount': '10.00'})
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('90.00'))
+
+
+class OtpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='olga', email='olga@example.com', password='pass12345')
+        self.user.generate_totp_secret()
+
+    def code(self, at=None):
+        return otp.totp(self.user.totp_secret).at(at or time.time())
+
+    def test_code_is_accepted_once(self):
+        code = self.code()
+        self.assertTrue(self.user.verify_otp(code))
+        self.assertFalse(self.user.verify_otp(code))
+
+    def test_wrong_stale_and_malformed_codes_are_rejected(self):
+        now = time.time()
+        self.assertFalse(otp.verify(self.user, self.code(now - 120), now=now))
+        self.assertFalse(otp.verify(self.user, 'abcdef', now=now))
+        self.assertFalse(otp.verify(self.user, '', now=now))
+
+    def test_qr_is_rendered_once_per_secret(self):
+        with mock.patch.object(otp, 'render_svg', wraps=otp.render_svg) as render:
+            first = otp.qr_svg(self.user)
+            self.assertEqual(otp.qr_svg(self.user), first)
+            self.assertEqual(render.call_count, 1)
+            self.user.generate_totp_secret()
+            self.assertNotEqual(otp.qr_svg(self.user), first)
+        self.assertTrue(first.startswith('<svg'))
+
+    def test_verify_page_shows_svg_and_rejects_replay(self):
+        session = self.client.session
+        session['otp_user_id'] = self.user.pk
+        session.save()
+        response = self.client.get(reverse('verify_otp'))
+        self.assertContains(response, '<svg xmlns="http://www.w3.org/2000/svg"')
+
+        code = self.code()
+        self.assertTrue(otp.verify(self.user, code))  # someone else got there first
+        response = self.client.post(reverse('verify_otp'), {'otp': code})
+        self.assertContains(response, 'Invalid OTP.')
+
+
+class LoginHistoryBufferTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='lena', email='lena@example.com', password='pass12345')
+        self.buffer = loginlog.LoginBuffer(size=1000, interval=3600)  # flushed by hand below
+        self.addCleanup(self.buffer.close)
+
+    def log_in(self, session_key):
+        self.buffer.login(user=self.user, ip_address='127.0.0.1', user_agent='test', session_key=session_key)
+
+    def test_flush_writes_logins_then_logouts_in_batches(self):
+        for i in range(5):
+            self.log_in(f's{i}')
+        self.buffer.logout(self.user.pk, 's1', timezone.now())
+        self.buffer.logout(self.user.pk, 's2', timezone.now())
+        self.assertFalse(LoginHistory.objects.exists())
+
+        with self.assertNumQueries(3):  # INSERT, SELECT open sessions, UPDATE
+            self.assertEqual(self.buffer.flush(), (5, 2))
+        self.assertEqual(LoginHistory.objects.count(), 5)
+        self.assertEqual(LoginHistory.objects.filter(logout_time__isnull=True).count(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buffer.flush(), (0, 0))
+
+    def test_large_logout_batch_is_applied_in_chunks(self):
+        other = CustomUser.objects.create_user(username='omar', email='omar@example.com', password='pass12345')
+        LoginHistory.objects.bulk_create(
+            [LoginHistory(user=self.user, ip_address='127.0.0.1', user_agent='test', session_key=f's{i}') for i in range(1500)]
+            + [LoginHistory(user=other, ip_address='127.0.0.1', user_agent='test', session_key='s0')]
+        )
+        for i in range(1500):
+            self.buffer.logout(self.user.pk, f's{i}', timezone.now())
+        self.assertEqual(self.buffer.flush(), (0, 1500))
+        self.assertFalse(LoginHistory.objects.filter(user=self.user, logout_time__isnull=True).exists())
+        self.assertTrue(LoginHistory.objects.filter(user=other, logout_time__isnull=True).exists())
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        self.log_in('good')
+        self.log_in('bad')
+        save = LoginHistory.save
+
+        def fail_bad_row(row, *args, **kwargs):
+            if row.session_key == 'bad':
+                raise IntegrityError('bad row')
+            return save(row, *args, **kwargs)
+
+        with mock.patch.object(LoginHistory.objects, 'bulk_create', side_effect=IntegrityError('batch')), \
+                mock.patch.object(LoginHistory, 'save', autospec=True, side_effect=fail_bad_row), \
+                self.assertLogs('wallet.loginlog', 'WARNING') as logs:
+            self.assertEqual(self.buffer.flush(), (1, 0))
+            for _ in range(loginlog.MAX_ATTEMPTS - 1):
+                self.buffer.flush()
+        self.assertTrue(any('Dropping login event' in line for line in logs.output))
+        self.assertEqual(list(LoginHistory.objects.values_list('session_key', flat=True)), ['good'])
+        self.assertEqual(self.buffer.flush(), (0, 0))
+
+    def test_buffer_is_capped(self):
+        with mock.patch.object(loginlog, 'MAX_BUFFERED', 2):
+            for i in range(3):
+                self.log_in(f's{i}')
+            with self.assertLogs('wallet.loginlog', 'ERROR'):
+                self.assertEqual(self.buffer.flush(), (2, 0))
+
+    def test_session_key_is_read_at_flush(self):
+        session = mock.Mock(session_key=None)
+        self.buffer.login(user=self.user, ip_address='127.0.0.1', user_agent='test', session_key=None, session=session)
+        session.session_key = 'saved-later'
+        self.buffer.flush()
+        self.assertEqual(LoginHistory.objects.get().session_key, 'saved-later')
+
+    def test_forwarded_for_must_be_an_ip(self):
+        from .signals import get_client_ip
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='<script>, 10.0.0.1', REMOTE_ADDR='192.0.2.7')
+        self.assertEqual(get_client_ip(request), '192.0.2.7')
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='2001:db8::1, 10.0.0.1')
+        self.assertEqual(get_client_ip(request), '2001:db8::1')
+
+    def test_logout_closes_session_row(self):
+        login(self.client, self.user)
+        entry = LoginHistory.objects.get()
+        self.client.post(reverse('logout'))
+        entry.refresh_from_db()
+        self.assertIsNotNone(entry.logout_time)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttle.limiter.reset()
+        self.addCleanup(throttle.limiter.reset)
+
+    def test_workers_lease_tokens_in_batches(self):
+        workers = [throttle.Limiter(), throttle.Limiter()]
+        now = 120.0
+        with mock.patch.object(cache, 'incr', wraps=cache.incr) as incr:
+            allowed = sum(workers[i % 2].allow('test', 'ip', 60, 60, now=now) for i in range(100))
+            self.assertEqual(allowed, 60)
+            # 10 leases of 6 (+1 INCR before the counter exists), then one refusal per worker
+            self.assertEqual(incr.call_count, 13)
+            self.assertFalse(workers[0].allow('test', 'ip', 60, 60, now=now))
+            self.assertEqual(incr.call_count, 13)  # over the limit: refused locally
+        self.assertTrue(workers[0].allow('test', 'ip', 60, 60, now=now + 60))  # next window
+
+    def test_small_limits_still_lease_in_batches(self):
+        with mock.patch.object(cache, 'incr', wraps=cache.incr) as incr, \
+                mock.patch.object(throttle, 'time', mock.Mock(time=lambda: 120.0)):  # one window throughout
+            for _ in range(5):  # login is 5/m
+                self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+            # A lease of 3 (+1 INCR before the counter exists), then the last 2
+            self.assertEqual(incr.call_count, 3)
+            self.assertEqual(self.client.get(reverse('login')).status_code, 429)
+
+    def test_cache_failure_fails_open(self):
+        with mock.patch.object(cache, 'incr', side_effect=ConnectionError('down')), self.assertLogs('wallet.throttle', 'WARNING'):
+            self.assertTrue(all(throttle.limiter.allow('test', 'ip', 1, 60) for _ in range(3)))
+
+    def test_policies_apply_per_view_and_role(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('login')).status_code, 429)
+        self.assertEqual(self.client.post(reverse('login'), {}).status_code, 200)  # only page loads count
+
+        user = make_wallet('rita').user
+        login(self.client, user)
+        for _ in range(5):
+            self.client.get(reverse('ledger_view'))
+        self.assertEqual(self.client.get(reverse('ledger_view')).status_code, 429)
+        request = AsyncRequestFactory().get('/')
+        request.user = user
+        self.assertFalse(throttle.is_limited(request, 'manager_dashboard'))  # no limit for customers
+
+
+class StatementExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttle.limiter.reset()
+        self.wallet = make_wallet('dave', balance='100.00')
+        approved(self.wallet, 'DEPOSIT', '5.00')
+        approved(self.wallet, 'WITHDRAW', '2.00')
+
+    def test_command_streams_csv(self):
+        out = StringIO()
+        call_command('export_statement', str(self.wallet.pk), stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0].split(','), ['entry_id', 'timestamp', 'tx_id', 'tx_type', 'entry_type', 'amount', 'balance_after'])
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[2].endswith('WITHDRAW,debit,2.00,103.00'))
+
+    def test_view_streams_ndjson(self):
+        login(self.client, self.wallet.user)
+        response = self.client.get(reverse('statement_export'), {'wallet': self.wallet.pk, 'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([r['entry_type'] for r in records], ['credit', 'debit'])
+        self.assertEqual(records[-1]['balance_after'], '103.00')
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_view_rejects_bad_wallet_and_dates(self):
+        login(self.client, self.wallet.user)
+        url = reverse('statement_export')
+        self.assertEqual(self.client.get(url, {'wallet': 'abc'}).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        for bad in ('2024-13-45', 'yesterday', '2024-02-30'):
+            self.assertEqual(self.client.get(url, {'wallet': self.wallet.pk, 'from': bad}).status_code, 400)
+            self.assertEqual(self.client.get(url, {'wallet': self.wallet.pk, 'to': bad}).status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command('export_statement', str(self.wallet.pk), '--from', 'not-a-date', stdout=StringIO())
+
+
+class BalanceAtTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet('erin', balance='50.00')
+        start = timezone.now() - timedelta(days=10)
+        self.times = []
+        for day, (tx_type, amount) in enumerate([('DEPOSIT', '10.00'), ('DEPOSIT', '5.00'),
+                                                  ('WITHDRAW', '20.00'), ('DEPOSIT', '1.00'), ('DEPOSIT', '2.00')]):
+            tx = approved(self.wallet, tx_type, amount)
+            ts = start + timedelta(days=day)
+            Ledger.objects.filter(transaction=tx).update(timestamp=ts)
+            self.times.append(ts)
+        LedgerCheckpoint.objects.all().delete()
+
+    def test_backfill_and_replay_tail(self):
+        self.assertEqual(checkpoints.backfill(self.wallet, every=2), 3)
+        expected = ['50.00', '60.00', '65.00', '45.00', '46.00', '48.00']
+
+        self.assertEqual(self.wallet.balance_at(self.times[0] - timedelta(hours=1)), Decimal(expected[0]))
+        for ts, balance in zip(self.times, expected[1:]):
+            self.assertEqual(self.wallet.balance_at(ts), Decimal(balance))
+            self.assertEqual(self.wallet.balance_at(ts + timedelta(hours=1)), Decimal(balance))
+
+    def test_without_checkpoints(self):
+        self.assertEqual(self.wallet.balance_at(self.times[2]), Decimal('45.00'))
+
+    def test_posting_counts_entries_since_checkpoint(self):
+        approved(self.wallet, 'DEPOSIT', '1.00')  # first posting today checkpoints
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.entries_since_checkpoint, 0)
+        with mock.patch.object(checkpoints, 'CHECKPOINT_EVERY', 3):
+            for _ in range(2):
+                approved(self.wallet, 'DEPOSIT', '1.00')
+            self.wallet.refresh_from_db()
+            self.assertEqual(self.wallet.entries_since_checkpoint, 2)
+            with CaptureQueriesContext(connection) as queries:
+                approved(self.wallet, 'DEPOSIT', '1.00')
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'] and 'wallet_ledger' in q['sql']])
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.entries_since_checkpoint, 0)
+        self.assertEqual(checkpoints.latest_checkpoint(self.wallet).balance, self.wallet.balance)
+
+
+class ReconcileLedgersTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("worker processes need a file-backed test database")
+        self.good = make_wallet('frank', balance='10.00')
+        self.drifted = make_wallet('gina', balance='10.00')
+        self.gap = make_wallet('hank', balance='10.00')
+        for wallet in (self.good, self.drifted, self.gap):
+            approved(wallet, 'DEPOSIT', '5.00')
+            approved(wallet, 'WITHDRAW', '3.00')
+        # Balance changed without a ledger row
+        Wallet.objects.filter(pk=self.drifted.pk).update(balance=Decimal('99.00'))
+        # A broken link in the balance_after chain
+        entry = Ledger.objects.filter(wallet=self.gap).order_by('id').last()
+        Ledger.objects.filter(pk=entry.pk).update(balance_after=Decimal('1.00'))
+        self.gap_entry = entry
+
+    def run_command(self, workers):
+        out = StringIO()
+        call_command('reconcile_ledgers', workers=workers, wallets_per_task=1, stdout=out)
+        return out.getvalue()
+
+    def test_reports_mismatches_inline_and_in_pool(self):
+        for workers in (1, 2):
+            output = self.run_command(workers)
+            self.assertIn("Checked 3 wallets / 6 entries", output)
+            self.assertIn(f"Wallet {self.drifted.pk}: balance 99.00 != ledger 12.00", output)
+            self.assertIn(f"first divergent entry {self.gap_entry.pk}", output)
+            self.assertNotIn(f"Wallet {self.good.pk}:", output)
+            self.assertIn("2 wallet(s) out of balance.", output)
+
+    def test_balance_without_backing_entries_is_a_mismatch(self):
+        # Changed before the first ledger entry
+        early = make_wallet('ivy', balance='10.00')
+        Wallet.objects.filter(pk=early.pk).update(balance=Decimal('50.00'))
+        early.refresh_from_db()
+        approved(early, 'DEPOSIT', '5.00')
+        checked, mismatch = reconciliation.reconcile_wallet(early.pk, Decimal('55.00'), early.opening_balance)
+        self.assertEqual(checked, 1)
+        self.assertEqual(mismatch['first_divergent']['expected'], Decimal('15.00'))
+
+        # No ledger at all
+        bare = make_wallet('jack')
+        Wallet.objects.filter(pk=bare.pk).update(balance=Decimal('7.00'))
+        self.assertEqual(reconciliation.reconcile_range(bare.pk, bare.pk + 1)[2][0]['ledger_balance'], Decimal('0.00'))
+        self.assertEqual(reconciliation.reconcile_range(self.good.pk, self.good.pk + 1)[2], [])
+
+
+class OpeningBalanceBackfillTests(TestCase):
+    def test_legacy_wallets_open_before_their_first_entry(self):
+        from importlib import import_module
+        from django.apps import apps
+        backfill = import_module('wallet.migrations.0017_wallet_opening_balance').backfill_opening_balances
+
+        legacy = make_wallet('kim', balance='40.00')
+        approved(legacy, 'WITHDRAW', '5.00')
+        approved(legacy, 'DEPOSIT', '2.00')
+        bare = make_wallet('lou', balance='7.00')
+        Wallet.objects.update(opening_balance=0)  # as the AddField left them
+
+        backfill(apps, None)
+        legacy.refresh_from_db()
+        bare.refresh_from_db()
+        self.assertEqual(legacy.opening_balance, Decimal('40.00'))
+        self.assertEqual(bare.opening_balance, Decimal('7.00'))
+        self.assertIsNone(reconciliation.reconcile_wallet(legacy.pk, legacy.balance, legacy.opening_balance)[1])
+
+
+class VelocityRuleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wallet = make_wallet('ivy', balance='100.00')
+
+    def test_third_transaction_in_window_is_flagged_without_counting_rows(self):
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                approved(self.wallet, 'DEPOSIT', '1.00')
+        self.assertFalse(FraudLog.objects.exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            tx = approved(self.wallet, 'DEPOSIT', '1.00')
+        self.assertFalse(any('COUNT(' in q['sql'] and 'FROM "wallet_transaction"' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(FraudLog.objects.get(transaction=tx).reason, "⚠️ 3 transactions within 10 minutes")
+
+
+class FraudRuleEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.busy = make_wallet('jack', balance='2000000.00')
+        self.quiet = make_wallet('kate', balance='2000000.00')
+        self.now = timezone.now()
+
+    def at(self, wallet, tx_type, amount, minutes_ago):
+        tx = approved(wallet, tx_type, amount)
+        ts = self.now - timedelta(minutes=minutes_ago)
+        Transaction.objects.filter(pk=tx.pk).update(created_at=ts, processed_at=ts)
+        return tx
+
+    def test_bulk_sweep_matches_rules_and_is_idempotent(self):
+        burst = [self.at(self.busy, 'DEPOSIT', '10.00', m) for m in (30, 28, 25)]
+        self.at(self.quiet, 'DEPOSIT', '10.00', 30)
+        self.at(self.quiet, 'DEPOSIT', '10.00', 5)
+        big = [self.at(self.quiet, 'WITHDRAW', '300000.00', m) for m in (120, 60)]
+        FraudLog.objects.all().delete()
+
+        evaluated, flagged = fraud.sweep(self.now - timedelta(hours=3))
+        self.assertEqual(evaluated, 7)
+        reasons = dict(FraudLog.objects.values_list('transaction_id', 'reason'))
+        self.assertEqual(reasons, {
+            burst[2].pk: "⚠️ 3 transactions within 10 minutes",
+            big[1].pk: "Withdrawals exceeded ₹5L in 24 hours",
+        })
+        self.assertEqual(fraud.sweep(self.now - timedelta(hours=3)), (7, 0))
+
+    def test_inline_approval_flags_large_withdrawal(self):
+        self.quiet.freeze(Decimal('600000.00'))
+        tx = Transaction.objects.create(wallet=self.quiet, tx_type='WITHDRAW', amount=Decimal('600000.00'))
+        tx.status = 'APPROVED'
+        tx.processed_at = timezone.now()
+        posting.post(tx, release_hold=True)
+        tx.save()
+        self.assertEqual(
+            set(FraudLog.objects.filter(transaction=tx).values_list('reason', flat=True)),
+            {"⚠️ High-value transaction over ₹500000", "Withdraw above ₹5L", "Withdrawals exceeded ₹5L in 24 hours"},
+        )
+
+
+class BacktestFraudTests(TestCase):
+    def test_grid_counts_without_writing_fraud_logs(self):
+        cache.clear()
+        wallet = make_wallet('liam', balance='0.00')
+        now = timezone.now()
+        for minutes, amount in [(40, '100.00'), (36, '200000.00'), (33, '600000.00'), (5, '50.00')]:
+            tx = approved(wallet, 'DEPOSIT', amount)
+            Transaction.objects.filter(pk=tx.pk).update(created_at=now - timedelta(minutes=minutes))
+        FraudLog.objects.all().delete()
+
+        out = StringIO()
+        call_command('backtest_fraud', amount_limit=[150000, 500000], txn_count=[3], window=[5, 10], stdout=out)
+        lines = [line.split('\t') for line in out.getvalue().splitlines()[1:5]]
+        flagged = {(float(l[0]), int(l[2])): (int(l[4]), int(l[5])) for l in lines}
+        self.assertEqual(flagged, {
+            (150000.0, 5): (2, 0), (150000.0, 10): (2, 1),
+            (500000.0, 5): (1, 0), (500000.0, 10): (1, 1),
+        })
+        self.assertFalse(FraudLog.objects.exists())
+
+    def test_grid_runs_the_registered_rules(self):
+        wallet = make_wallet('mia', balance='0.00')
+        for amount in ('10.00', '20.00', '900.00'):
+            approved(wallet, 'DEPOSIT', amount)
+        small = fraud.Rule('small', lambda batch: batch.amounts < 50, None, None, None)
+        with mock.patch.object(fraud, 'RULES', fraud.RULES + [small]):
+            results = backtest.run_grid(backtest.load_batch(), {'amount_limit': [15, 1000], 'txn_count': [10]})
+        self.assertEqual([(r['amount_limit'], r['high_value'], r['small'], r['flagged']) for r in results],
+                         [(15, 2, 2, 3), (1000, 0, 2, 2)])
+        with self.assertRaises(ValueError):
+            backtest.run_grid(backtest.load_batch(), {'amount_limt': [1]})
+
+
+    def test_loaded_types_and_statuses_are_int8_codes(self):
+        wallet = make_wallet('nia', balance='50.00')
+        withdrawal = approved(wallet, 'WITHDRAW', '5.00')
+        pending = Transaction.objects.create(wallet=wallet, tx_type='DEPOSIT', amount=Decimal('1.00'))
+        batch = backtest.load_batch(chunk_size=1)
+        self.assertEqual((batch.tx_types.dtype, batch.statuses.dtype), (np.int8, np.int8))
+        self.assertEqual(dict(zip(batch.ids.tolist(), batch.approved_withdrawals.tolist())),
+                         {withdrawal.pk: True, pending.pk: False})
+
+class WithdrawalBucketTests(TestCase):
+    def test_posting_maintains_hourly_buckets(self):
+        wallet = make_wallet('mia', balance='1000.00')
+        approved(wallet, 'WITHDRAW', '100.00')
+        approved(wallet, 'WITHDRAW', '50.00')
+        approved(wallet, 'DEPOSIT', '500.00')
+        old = timezone.now() - timedelta(hours=30)
+        WithdrawalBucket.objects.create(wallet=wallet, hour=old.replace(minute=0, second=0, microsecond=0), total=Decimal('999.00'))
+
+        self.assertEqual(WithdrawalBucket.objects.filter(wallet=wallet).count(), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(limits.withdrawn_within(wallet.pk, 24), Decimal('150.00'))
+        self.assertEqual(limits.withdrawn_within(wallet.pk, 48), Decimal('1149.00'))
+
+
+class EmailOutboxTests(TestCase):
+    def test_approval_mail_is_queued_then_sent_in_one_batch(self):
+        wallet = make_wallet('noah', balance='10.00')
+        approved(wallet, 'DEPOSIT', '5.00')
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(EmailOutbox.objects.filter(status='PENDING').count(), 1)
+
+        out = StringIO()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as opened:
+            call_command('send_outbox', stdout=out)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual([m.to for m in mail.outbox], [['noah@example.com']])
+        self.assertEqual(EmailOutbox.objects.get().status, 'SENT')
+
+    def test_failures_back_off_then_give_up(self):
+        item = outbox.enqueue('x@example.com', 'Hi', 'Body')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')), \
+                self.assertLogs('wallet.outbox', 'WARNING'):
+            for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+                EmailOutbox.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+                self.assertEqual(outbox.drain(), (0, 1))
+                item.refresh_from_db()
+                self.assertEqual(item.attempts, attempt)
+                self.assertGreater(item.next_attempt_at, timezone.now() + timedelta(seconds=outbox.BACKOFF_SECONDS * 2 ** (attempt - 1) - 5))
+        self.assertEqual(item.status, 'FAILED')
+        self.assertEqual(item.last_error, 'down')
+
+
+    def test_a_row_read_by_two_workers_is_claimed_once(self):
+        for to in ('a@example.com', 'b@example.com'):
+            outbox.enqueue(to, 'Hi', 'Body')
+        update = QuerySet.update
+        other = []
+
+        def race(queryset, **kwargs):
+            # Another worker claims the same rows after this one read them
+            if not other:
+                other.append(None)
+                other[:] = outbox.claim()
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=race):
+            mine = outbox.claim()
+        self.assertEqual(len(other), 2)
+        self.assertEqual(mine, [])
+
+class FraudAlertTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wallet = make_wallet('olga', balance='5000000.00')
+
+    def test_burst_sends_one_user_alert_and_no_inline_admin_mail(self):
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                approved(self.wallet, 'DEPOSIT', '600000.00')
+        self.assertGreater(FraudLog.objects.count(), 3)
+        alerts_queued = EmailOutbox.objects.filter(subject__startswith='⚠️ Fraud Alert')
+        self.assertEqual(list(alerts_queued.values_list('to_email', flat=True)), ['olga@example.com'])
+        self.assertFalse(EmailOutbox.objects.filter(to_email=fraud.ADMIN_EMAIL).exists())
+
+    def test_admin_digest_waits_for_window_then_covers_every_log(self):
+        for _ in range(2):
+            approved(self.wallet, 'DEPOSIT', '600000.00')
+        logs = FraudLog.objects.count()
+        self.assertEqual(alerts.send_admin_digest(), 0)
+
+        later = timezone.now() + timedelta(minutes=alerts.ALERT_WINDOW_MINUTES)
+        self.assertEqual(alerts.send_admin_digest(now=later), logs)
+        digest = EmailOutbox.objects.get(to_email=fraud.ADMIN_EMAIL)
+        self.assertIn(f"{logs} flagged", digest.subject)
+        self.assertEqual(digest.body.count('olga'), logs)
+        self.assertEqual(alerts.send_admin_digest(now=later), 0)
+
+
+class FxRateServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.rates = fx.FxRateService()
+        self.now = timezone.now()
+
+    def quote(self, base, quote, rate, days_ago=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            FxRate.objects.create(base=base, quote=quote, rate=Decimal(rate),
+                                  effective_at=self.now - timedelta(days=days_ago))
+
+    def test_cross_rates_go_through_the_pivot(self):
+        self.quote('EUR', 'INR', '90')
+        self.assertEqual(self.rates.rate('USD', 'INR'), Decimal('83'))
+        self.assertEqual(self.rates.rate('USD', 'EUR'), Decimal('83') / Decimal('90'))
+        self.assertEqual(self.rates.rate('BTC', 'USD'), Decimal('3300000') / Decimal('83'))
+        with self.assertNumQueries(0):
+            self.rates.rate('EUR', 'BTC')
+
+    def test_missing_rate_is_an_error_not_one(self):
+        FxRate.objects.filter(base='BTC').delete()
+        FxRate.objects.filter(quote='BTC').delete()
+        with self.assertRaises(fx.RateUnavailable):
+            self.rates.rate('BTC', 'USD')
+
+    def test_new_rate_replaces_cached_matrix(self):
+        self.assertEqual(self.rates.rate('USD', 'INR'), Decimal('83'))
+        self.quote('USD', 'INR', '84')
+        self.assertEqual(fx.rates.rate('USD', 'INR'), Decimal('84'))
+        self.assertEqual(fx.FxRateService().rate('USD', 'INR'), Decimal('84'))
+
+    def test_rate_at_uses_the_rate_in_effect(self):
+        self.quote('EUR', 'INR', '88', days_ago=10)
+        self.quote('EUR', 'INR', '90', days_ago=2)
+        self.assertEqual(self.rates.rate_at(('EUR', 'INR'), self.now - timedelta(days=5)), Decimal('88'))
+        self.assertEqual(self.rates.rate_at(('EUR', 'INR'), self.now), Decimal('90'))
+        self.assertEqual(self.rates.rate_at(('INR', 'EUR'), self.now - timedelta(days=5)), 1 / Decimal('88'))
+        self.assertEqual(self.rates.rate_at(('EUR', 'USD'), self.now - timedelta(days=5)), Decimal('88') / Decimal('83'))
+        with self.assertRaises(fx.RateUnavailable):
+            self.rates.rate_at(('EUR', 'INR'), self.now - timedelta(days=11))
+
+
+class PortfolioValuationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        fx.rates.invalidate()
+        self.inr = make_wallet('pia', 'INR', '1000.00')
+        self.usd = Wallet.objects.create(user=self.inr.user, currency=Currency.objects.create(code='USD'), balance=Decimal('10.00'))
+        self.eur = make_wallet('quinn', 'EUR', '5.00')  # no EUR rate seeded
+        self.btc = make_wallet('rosa', 'BTC', '0.01')
+
+    def test_totals_by_currency_and_user(self):
+        aum = valuation.value_portfolio('INR')
+        self.assertAlmostEqual(aum.total, 1000 + 10 * 83 + 0.01 * 3300000)
+        self.assertEqual(aum.by_currency['USD'], (10.0, 830.0))
+        self.assertEqual(aum.by_currency['EUR'], (5.0, None))
+        self.assertEqual(aum.unpriced, ['EUR'])
+        self.assertEqual(valuation.top_users(aum, 5), [(self.btc.user_id, 33000.0), (self.inr.user_id, 1830.0)])
+
+    def test_manager_dashboard_shows_assets_under_management(self):
+        manager = CustomUser.objects.create_user(username='mgr', email='mgr@example.com', password='pass12345', role='manager')
+        login(self.client, manager)
+        response = self.client.get(reverse('manager_dashboard'))
+        self.assertContains(response, 'Assets Under Management: 34830.00 INR')
+
+
+class ManagerDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = CustomUser.objects.create_user(username='boss', email='boss@example.com', password='pass12345', role='manager')
+        login(self.client, self.manager)
+
+    def populate(self, n, prefix):
+        for i in range(n):
+            wallet = make_wallet(f'{prefix}{i}', balance='10.00')
+            tx = Transaction.objects.create(wallet=wallet, tx_type='DEPOSIT', amount=Decimal('1.00'))
+            FraudLog.objects.create(user=wallet.user, transaction=tx, reason='test')
+
+    def queries(self, section):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('manager_dashboard'), {'section': section})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_budget_does_not_grow_with_rows(self):
+        self.populate(3, 'few')
+        self.client.get(reverse('manager_dashboard'))  # fills the AUM cache
+        few = {section: self.queries(section) for section in ('pending', 'fraud', 'wallets', 'customers')}
+        self.populate(60, 'many')
+        many = {section: self.queries(section) for section in few}
+        self.assertEqual(few, many)
+        self.assertLess(max(many.values()), 10)
+
+    def test_sections_are_paginated(self):
+        self.populate(55, 'u')
+        response = self.client.get(reverse('manager_dashboard'), {'section': 'wallets'})
+        self.assertEqual(len(response.context['rows']), 50)
+        self.assertContains(response, '<span class="badge bg-secondary">55</span>')
+        older = self.client.get(reverse('manager_dashboard'), {'section': 'wallets', 'after': response.context['page'].next_cursor})
+        self.assertEqual(len(older.context['rows']), 5)
+
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wallet = make_wallet('sam', balance='100.00')
+        self.manager = CustomUser.objects.create_user(username='chief', email='chief@example.com', password='pass12345', role='manager')
+
+    def assert_matches_rebuild(self):
+        live = {(metric, key): (count, amount) for metric, key, count, amount in summary.counters()}
+        fresh = {(row.metric, row.key): (row.count, row.amount) for row in summary.compute()}
+        self.assertEqual({k: v for k, v in live.items() if v != (0, 0)}, {k: v for k, v in fresh.items() if v != (0, 0)})
+
+    def test_incremental_updates_match_a_rebuild(self):
+        login(self.client, self.manager)
+        self.wallet.freeze(Decimal('30.00'))
+        pending = Transaction.objects.create(wallet=self.wallet, tx_type='WITHDRAW', amount=Decimal('30.00'))
+        self.wallet.freeze(Decimal('20.00'))
+        rejected = Transaction.objects.create(wallet=self.wallet, tx_type='WITHDRAW', amount=Decimal('20.00'))
+        approved(self.wallet, 'DEPOSIT', '600000.00')  # flagged as high value
+        self.assertEqual(summary.snapshot()['pending'], 2)
+
+        self.client.get(reverse('approve_transaction', args=[pending.pk]))
+        self.client.get(reverse('reject_transaction', args=[rejected.pk]))
+
+        totals = summary.snapshot()
+        self.assertEqual(totals['pending'], 0)
+        self.assertEqual(totals['currencies']['INR'], {'balance': Decimal('600070.00'), 'frozen': Decimal('0.00')})
+        self.assertEqual(totals['fraud'], 1)
+        self.assert_matches_rebuild()
+
+    def test_counters_are_spread_over_slots(self):
+        for slot in range(summary.SLOTS):
+            with mock.patch('wallet.summary.random.randrange', return_value=slot):
+                summary.bump('pending', count=1)
+        self.assertEqual(DashboardSummary.objects.filter(metric='pending').count(), summary.SLOTS)
+        self.assertEqual(summary.snapshot()['pending'], summary.SLOTS)
+        call_command('rebuild_dashboard_summary', stdout=StringIO())
+        self.assertEqual(DashboardSummary.objects.filter(metric='wallets').count(), 1)
+
+    def test_releasing_more_than_the_hold_counts_only_the_hold(self):
+        self.wallet.freeze(Decimal('10.00'))
+        self.wallet.unfreeze(Decimal('25.00'))
+        self.wallet.freeze(Decimal('2.00'))
+        tx = Transaction.objects.create(wallet=self.wallet, tx_type='DEPOSIT', amount=Decimal('5.00'))
+        self.assertTrue(posting.post(tx, release_hold=True))
+        Transaction.objects.filter(pk=tx.pk).update(status='APPROVED')
+        summary.bump('pending', count=-1)  # as the approve view does
+        self.assertEqual(summary.snapshot()['currencies']['INR']['frozen'], Decimal('0.00'))
+        self.assert_matches_rebuild()
+
+    def test_rebuild_command_fixes_drift(self):
+        DashboardSummary.objects.filter(metric='wallets').delete()
+        DashboardSummary.objects.create(metric='wallets', count=99)
+        out = StringIO()
+        call_command('rebuild_dashboard_summary', '--check', stdout=out)
+        self.assertIn('wallets[]: 99 / 0 -> 1 / 0', out.getvalue())
+        call_command('rebuild_dashboard_summary', stdout=StringIO())
+        self.assertEqual(summary.snapshot()['wallets'], 1)
+        self.assertEqual(summary.snapshot()['customers'], 1)
+
+
+class BulkReviewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = CustomUser.objects.create_user(username='lead', email='lead@example.com', password='pass12345', role='manager')
+        self.alice = make_wallet('tara', balance='100.00')
+        self.bob = make_wallet('uma', balance='10.00')
+
+    def pending(self, wallet, tx_type, amount, target=None):
+        wallet.freeze(Decimal(amount))
+        if target:
+            target.freeze(Decimal(amount))
+        return Transaction.objects.create(wallet=wallet, target_wallet=target, tx_type=tx_type,
+                                          amount=Decimal(amount), converted_amount=Decimal(amount) if target else None)
+
+    def test_bulk_approve_posts_in_set_based_statements(self):
+        txs = [self.pending(self.alice, 'WITHDRAW', '1.00') for _ in range(40)]
+        transfer = self.pending(self.alice, 'TRANSFER', '50.00', target=self.bob)
+        overdraft = self.pending(self.bob, 'WITHDRAW', '500.00')
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = bulk.approve([tx.pk for tx in txs] + [transfer.pk, overdraft.pk], self.manager)
+        self.assertLess(len(ctx.captured_queries), 30)
+
+        self.assertEqual(len(result.processed), 41)
+        self.assertEqual(list(result.failed), [overdraft.pk])
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.balance, Decimal('10.00'))
+        self.assertEqual(self.bob.balance, Decimal('60.00'))
+        self.assertEqual(self.alice.frozen_amount, Decimal('0.00'))
+        self.assertEqual(self.bob.frozen_amount, Decimal('500.00'))
+        self.assertEqual(Ledger.objects.count(), 42)
+        self.assertEqual(Ledger.objects.filter(wallet=self.alice).order_by('-id').first().balance_after, Decimal('10.00'))
+        overdraft.refresh_from_db()
+        self.assertEqual((overdraft.status, overdraft.posted_at), ('PENDING', None))
+        self.assertEqual(EmailOutbox.objects.filter(subject='✅ Transaction Approved').count(), 41)
+        self.assertEqual(limits.withdrawn_within(self.alice.pk, 24), Decimal('40.00'))
+        self.assertEqual(summary.snapshot()['pending'], 1)
+
+        self.assertEqual(bulk.approve([tx.pk for tx in txs], self.manager).processed, [])
+
+    def test_bulk_reject_view_releases_holds(self):
+        txs = [self.pending(self.alice, 'WITHDRAW', '5.00') for _ in range(3)]
+        login(self.client, self.manager)
+        response = self.client.post(reverse('bulk_review_transactions'), {'action': 'reject', 'tx_ids': [tx.pk for tx in txs]})
+        self.assertRedirects(response, reverse('pending_transactions'))
+        self.alice.refresh_from_db()
+        self.assertEqual((self.alice.balance, self.alice.frozen_amount, self.alice.is_frozen), (Decimal('100.00'), Decimal('0.00'), False))
+        self.assertEqual(Transaction.objects.filter(status='REJECTED', approved_by=self.manager).count(), 3)
+        self.assertEqual(summary.snapshot()['pending'], 0)
+
+
+class PendingEventsTests(TestCase):
+    def setUp(self):
+        self.manager = CustomUser.objects.create_user(username='watcher', email='watcher@example.com', password='pass12345', role='manager')
+        self.wallet = make_wallet('vic', balance='50.00')
+
+    def test_broadcaster_delivers_across_threads_and_drops_oldest(self):
+        async def run():
+            broadcaster = events.Broadcaster()
+            queue = broadcaster.subscribe()
+            publisher = threading.Thread(target=lambda: [
+                broadcaster.publish({'event': 'approved', 'ids': [i]}) for i in range(events.QUEUE_SIZE + 2)
+            ])
+            publisher.start()
+            await asyncio.get_running_loop().run_in_executor(None, publisher.join)
+            await asyncio.sleep(0.05)
+            first = await queue.get()
+            broadcaster.unsubscribe(queue)
+            return first, queue.qsize()
+        first, remaining = asyncio.run(run())
+        self.assertEqual(first['ids'], [2])
+        self.assertEqual(remaining, events.QUEUE_SIZE - 1)
+
+    def test_new_and_processed_transactions_are_published_after_commit(self):
+        published = []
+        with mock.patch.object(events.broadcaster, 'publish', published.append):
+            with self.captureOnCommitCallbacks(execute=True):
+                tx = Transaction.objects.create(wallet=self.wallet, tx_type='DEPOSIT', amount=Decimal('5.00'))
+            self.assertEqual(published[0]['event'], 'created')
+            self.assertEqual((published[0]['id'], published[0]['user'], published[0]['currency']), (tx.pk, 'vic', 'INR'))
+            with self.captureOnCommitCallbacks(execute=True):
+                bulk.reject([tx.pk], self.manager)
+        self.assertEqual(published[1], {'event': 'rejected', 'ids': [tx.pk]})
+
+    def test_stream_requires_manager_and_asgi(self):
+        self.assertEqual(self.client.get(reverse('pending_events')).status_code, 403)
+        login(self.client, self.manager)
+        self.assertEqual(self.client.get(reverse('pending_events')).status_code, 501)
+
+    async def test_stream_pushes_events(self):
+        await sync_to_async(login)(self.async_client, self.manager)
+        response = await self.async_client.get(reverse('pending_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        events.broadcaster.publish({'event': 'approved', 'ids': [7]})
+        self.assertEqual(await asyncio.wait_for(pending, 2), b'event: approved\ndata: {"event": "approved", "ids": [7]}\n\n')
+        await stream.aclose()
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wallet = make_wallet('wendy', balance='75.00')
+        approved(self.wallet, 'DEPOSIT', '5.00')
+        self.manager = CustomUser.objects.create_user(username='overseer', email='overseer@example.com', password='pass12345', role='manager')
+        LoginHistory.objects.create(user=self.manager, ip_address='127.0.0.1', user_agent='test', session_key='abc')
+
+    async def call(self, view, user, path='/', **params):
+        request = AsyncRequestFactory().get(path, params)
+        request.user = user
+        request.session = {}
+        return await view(request)
+
+    async def test_async_views_render_the_same_pages(self):
+        wallet = await sync_to_async(Wallet.objects.select_related('user').get)(pk=self.wallet.pk)
+        response = await self.call(views.dashboard_view_async, wallet.user)
+        self.assertContains(response, '₹80.00')
+
+        response = await self.call(views.ledger_view_async, wallet.user, wallet=wallet.pk)
+        self.assertContains(response, wallet.account_number)
+        with self.assertRaises(Http404):
+            await self.call(views.ledger_view_async, self.manager, wallet=wallet.pk)
+
+        response = await self.call(views.manager_dashboard_async, self.manager, section='wallets')
+        self.assertContains(response, 'wendy')
+        response = await self.call(views.manager_login_history_async, self.manager)
+        self.assertContains(response, '1 active session')
+
+    async def test_async_views_require_login_and_role(self):
+        response = await self.call(views.dashboard_view_async, AnonymousUser(), '/wallet/dashboard/')
+        self.assertEqual(response.status_code, 302)
+        customer = await sync_to_async(CustomUser.objects.get)(username='wendy')
+        response = await self.call(views.manager_dashboard_async, customer, '/wallet/manager/')
+        self.assertEqual(response.status_code, 302)
+        response = await self.call(views.manager_login_history_async, customer, '/wallet/manager/login-history/')
+        self.assertEqual(response.status_code, 302)
+
+    def test_customers_cannot_list_login_history(self):
+        login(self.client, self.wallet.user)
+        response = self.client.get(reverse('manager_login_history'))
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('logins', response.context or {})
+
+    def test_login_history_is_paginated(self):
+        login(self.client, self.manager)
+        LoginHistory.objects.bulk_create([
+            LoginHistory(user=self.manager, ip_address='127.0.0.1', user_agent='test', session_key=f's{i}', logout_time=timezone.now())
+            for i in range(60)
+        ])
+        response = self.client.get(reverse('manager_login_history'))
+        self.assertEqual(len(response.context['logins']), 50)
+        self.assertEqual(response.context['active'], 2)  # setUp's session and this login
+
+    async def test_gather_inside_a_transaction_stays_on_the_request_connection(self):
+        threads = await concurrency.gather({'a': threading.get_ident, 'b': threading.get_ident})
+        self.assertEqual(threads['a'], threads['b'])
+
+
+class ConcurrentQueryTests(TransactionTestCase):
+    def test_gather_runs_groups_on_their_own_connections(self):
+        make_wallet('xena', balance='10.00')
+        barrier = threading.Barrier(2, timeout=5)
+
+        def group():
+            barrier.wait()  # only returns if both groups are running at once
+            return threading.get_ident(), Wallet.objects.count()
+
+        results = asyncio.run(concurrency.gather({'a': group, 'b': group}))
+        self.assertNotEqual(results['a'][0], results['b'][0])
+        self.assertEqual((results['a'][1], results['b'][1]), (1, 1))
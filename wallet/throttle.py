@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from functools import lru_cache, wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+# Every rate limit in one place: name -> (what is counted, {role: rate}).
+# Requests are counted per client IP ('ip') or per logged-in user ('user', the IP
+# when logged out). The rate is picked by the user's role ('anonymous' when logged
+# out), falling back to '*'; a role with no rate is not limited.
+POLICIES = {
+    'dashboard': ('ip', {'*': '60/m'}),
+    'deposit': ('user', {'*': '5/m'}),
+    'withdraw': ('user', {'*': '5/m'}),
+    'transfer': ('user', {'*': '5/m'}),
+    'ledger': ('user', {'*': '5/m'}),
+    'statement_export': ('user', {'*': '5/m'}),
+    'manager_dashboard': ('user', {'manager': '120/m'}),
+    'register': ('ip', {'*': '5/m'}),
+    'login': ('ip', {'*': '5/m'}),
+}
+LIMITED_METHODS = ('GET',)  # page loads; form posts go through the views' own checks
+
+LEASE_FRACTION = 10  # a worker takes a tenth of a limit from the shared counter at a time
+MIN_LEASE = 3  # ...but never fewer tokens than this, so small limits still batch
+MAX_BUCKETS = 10000  # local buckets kept before finished windows are dropped
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def _cache():
+    return caches[getattr(settings, 'RATELIMIT_CACHE', 'default')]
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'5/m' -> (5, 60): requests allowed per period of seconds."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+class Bucket:
+    __slots__ = ('window', 'expires', 'tokens', 'exhausted', 'lock')
+
+    def __init__(self, window, expires):
+        self.window = window
+        self.expires = expires
+        self.tokens = 0
+        self.exhausted = False
+        self.lock = threading.Lock()
+
+
+class Limiter:
+    """
+    Fixed-window limits shared by all workers through the cache, decided locally.
+
+    Each worker leases tokens from the window's shared counter in batches
+    (limit // LEASE_FRACTION at a time, but at least MIN_LEASE) and spends
+    them without asking the cache again; once the counter is used up the
+    key is refused locally until the window ends. So the cache sees one INCR
+    per lease instead of one per request, and none for a client that's
+    already over its limit.
+    Tokens leased but not spent when the window ends are lost, so limits
+    err on the strict side by at most a lease per worker.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, name, value, limit, period, now=None):
+        now = time.time() if now is None else now
+        window = int(now // period)
+        with self._lock:
+            bucket = self._buckets.get((name, value))
+            if bucket is None or bucket.window != window:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune(now)
+                bucket = self._buckets[(name, value)] = Bucket(window, (window + 1) * period)
+        with bucket.lock:
+            if bucket.tokens:
+                bucket.tokens -= 1
+                return True
+            if bucket.exhausted:
+                return False
+            granted = self._lease(f'rl:{name}:{value}:{window}', limit, bucket.expires - now)
+            if granted is None:
+                return True  # cache down: fail open
+            if not granted:
+                bucket.exhausted = True
+                return False
+            bucket.tokens = granted - 1
+            return True
+
+    def _lease(self, key, limit, ttl):
+        size = min(limit, max(MIN_LEASE, limit // LEASE_FRACTION))
+        try:
+            cache = _cache()
+            try:
+                count = cache.incr(key, size)
+            except ValueError:  # first lease of the window
+                cache.add(key, 0, int(ttl) + 1)
+                count = cache.incr(key, size)
+        except Exception as e:
+            logger.warning("Rate limit cache unavailable: %s", e)
+            return None
+        return max(0, min(size, limit - (count - size)))
+
+    def _prune(self, now):
+        self._buckets = {key: b for key, b in self._buckets.items() if b.expires > now}
+        if len(self._buckets) >= MAX_BUCKETS:
+            self._buckets = {}
+
+    def reset(self):
+        with self._lock:
+            self._buckets = {}
+
+
+limiter = Limiter()
+
+
+def is_limited(request, name):
+    """Count this request against policy ``name``; True if it is over the limit."""
+    if not getattr(settings, 'RATELIMIT_ENABLE', True) or request.method not in LIMITED_METHODS:
+        return False
+    key, rates = POLICIES[name]
+    ip = request.META.get('REMOTE_ADDR', '')
+    if key == 'ip' and set(rates) == {'*'}:
+        # Nothing depends on who the user is: don't load them
+        rate, value = rates['*'], ip
+    else:
+        user = request.user
+        role = user.role if user.is_authenticated else 'anonymous'
+        rate = rates.get(role, rates.get('*'))
+        value = f'user:{user.pk}' if key == 'user' and user.is_authenticated else ip
+    if rate is None:
+        return False
+    limit, period = parse_rate(rate)
+    return not limiter.allow(name, value, limit, period)
+
+
+def limited_response(request):
+    return render(request, 'rate.html', status=429)
+
+
+def ratelimit(name):
+    """Answer 429 once a request is over policy ``name``; works on sync and async views."""
+    POLICIES[name]  # fail at import for an unknown policy
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # request.user is loaded lazily from the session, which is a sync DB read
+                if await sync_to_async(is_limited)(request, name):
+                    return await sync_to_async(limited_response)(request)
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if is_limited(request, name):
+                return limited_response(request)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
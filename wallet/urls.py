@@ -1,21 +1,31 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
 
+
+def read_view(sync_view, async_view):
+    # Async views only pay off under ASGI; under WSGI each call would need its own event loop
+    return async_view if settings.ASYNC_READ_VIEWS else sync_view
+
+
 urlpatterns = [
-    path('dashboard/', views.dashboard_view, name='dashboard_view'),
+    path('dashboard/', read_view(views.dashboard_view, views.dashboard_view_async), name='dashboard_view'),
     path('deposit/', views.deposit_view, name='deposit_view'),
     path('withdraw/', views.withdraw_view, name='withdraw_view'),
     path('transfer/', views.transfer_view, name='transfer_view'),
-    path('ledger/', views.ledger_view, name='ledger_view'),
+    path('ledger/', read_view(views.ledger_view, views.ledger_view_async), name='ledger_view'),
+    path('ledger/export/', views.statement_export_view, name='statement_export'),
     path('transactions/pending/', views.pending_transactions, name='pending_transactions'),
     path('transactions/approve/<int:tx_id>/', views.approve_transaction, name='approve_transaction'),
     path('transactions/reject/<int:tx_id>/', views.reject_transaction, name='reject_transaction'),
+    path('transactions/bulk/', views.bulk_review_transactions, name='bulk_review_transactions'),
 
-    path('manager/', views.manager_dashboard, name='manager_dashboard'),
+    path('manager/', read_view(views.manager_dashboard, views.manager_dashboard_async), name='manager_dashboard'),
     path('manager/transactions/', views.manager_transaction_history, name='manager_transaction_history'),
     path('manager/approvals/', views.pending_transactions, name='pending_transactions'),
-    path('manager/login-history/', views.manager_login_history, name='manager_login_history'),
+    path('manager/approvals/events/', views.pending_events, name='pending_events'),
+    path('manager/login-history/', read_view(views.manager_login_history, views.manager_login_history_async), name='manager_login_history'),
 
 
 
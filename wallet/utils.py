@@ -1,9 +1,38 @@
+from decimal import Decimal
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .fx import rates
+from .models import Transaction, Wallet
+
+
 def get_conversion_rate(from_currency, to_currency):
-    
-    rates = {
-        ('INR', 'USD'): 0.012,
-        ('USD', 'INR'): 83.0,
-        ('INR', 'BTC'): 0.0000003,
-        ('BTC', 'INR'): 3300000,
-    }
-    return rates.get((from_currency, to_currency), 1)  # default: 1 if same currency
+    # Raises fx.RateUnavailable instead of silently converting at 1
+    return rates.rate(from_currency, to_currency)
+
+
+def annotated_wallets(user):
+    """
+    ``user``'s wallets with their currency and, in the same query:
+    ``available`` (balance minus holds), ``pending_holds`` (total of their
+    pending transactions) and ``last_activity`` (newest transaction either way).
+    """
+    money = DecimalField(max_digits=20, decimal_places=2)
+    pending = (Transaction.objects.filter(wallet=OuterRef('pk'), status='PENDING')
+               .order_by().values('wallet').annotate(total=Sum('amount')).values('total'))
+    latest = (Transaction.objects.filter(Q(wallet=OuterRef('pk')) | Q(target_wallet=OuterRef('pk')))
+              .order_by('-created_at').values('created_at')[:1])
+    return (Wallet.objects.filter(user=user)
+            .select_related('currency')
+            .annotate(
+                available=F('balance') - F('frozen_amount'),
+                pending_holds=Coalesce(Subquery(pending, output_field=money), Value(Decimal('0.00')), output_field=money),
+                last_activity=Subquery(latest),
+            )
+            .order_by('id'))
+
+
+def request_wallets(request):
+    # Loaded once per request and shared by the view, its forms and its template
+    if not hasattr(request, '_wallets'):
+        request._wallets = list(annotated_wallets(request.user))
+    return request._wallets
@@ -0,0 +1,85 @@
+from collections import namedtuple
+import numpy as np
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from .models import Currency, Wallet
+from .fx import PIVOT_CURRENCY, RateUnavailable, rates
+
+CHUNK_SIZE = 50000
+
+BALANCE_DTYPE = np.dtype([('user_id', np.int64), ('currency_id', np.int64), ('balance', np.float64)])
+
+Valuation = namedtuple('Valuation', ['base', 'total', 'by_currency', 'user_ids', 'user_totals', 'unpriced'])
+
+
+def load_balances(queryset=None, chunk_size=CHUNK_SIZE):
+    """
+    (user_id, currency_id, balance) of every wallet as one structured array.
+
+    Balances are cast to float in SQL so no Decimal objects are built per
+    row; the totals are for reporting, not for posting.
+    """
+    queryset = Wallet.objects.all() if queryset is None else queryset
+    rows = (queryset.order_by()
+            .annotate(balance_f=Cast('balance', FloatField()))
+            .values_list('user_id', 'currency_id', 'balance_f')
+            .iterator(chunk_size=chunk_size))
+    return np.fromiter(rows, dtype=BALANCE_DTYPE)
+
+
+def rate_vector(base=PIVOT_CURRENCY):
+    """Rates into ``base`` indexed by currency id (NaN where no rate exists), plus the id → code map."""
+    codes = dict(Currency.objects.values_list('id', 'code'))
+    vector = np.full(max(codes, default=0) + 1, np.nan)
+    for currency_id, code in codes.items():
+        try:
+            vector[currency_id] = float(rates.rate(code, base))
+        except RateUnavailable:
+            pass
+    return vector, codes
+
+
+def value_portfolio(base=PIVOT_CURRENCY, balances=None):
+    """
+    Value every wallet in ``base``: one rate lookup per currency, then a
+    gather and two bincounts over the balance columns.
+
+    Wallets in a currency with no rate are left out of the totals and their
+    codes are listed in ``unpriced``.
+    """
+    balances = load_balances() if balances is None else balances
+    vector, codes = rate_vector(base)
+
+    currency_ids = balances['currency_id']
+    values = balances['balance'] * vector[currency_ids]
+    priced = ~np.isnan(values)
+
+    native = np.bincount(currency_ids, weights=balances['balance'], minlength=len(vector))
+    valued = np.bincount(currency_ids[priced], weights=values[priced], minlength=len(vector))
+    present = np.bincount(currency_ids, minlength=len(vector)) > 0
+    by_currency = {
+        codes[i]: (float(native[i]), float(valued[i]) if not np.isnan(vector[i]) else None)
+        for i in np.flatnonzero(present)
+    }
+
+    user_ids, owner = np.unique(balances['user_id'][priced], return_inverse=True)
+    user_totals = np.bincount(owner, weights=values[priced], minlength=len(user_ids))
+
+    return Valuation(
+        base=base,
+        total=float(values[priced].sum()),
+        by_currency=by_currency,
+        user_ids=user_ids,
+        user_totals=user_totals,
+        unpriced=sorted(code for code, (_, value) in by_currency.items() if value is None),
+    )
+
+
+def top_users(valuation, n=10):
+    """The ``n`` users holding the most, as [(user_id, value in base)]."""
+    n = min(n, len(valuation.user_ids))
+    if not n:
+        return []
+    top = np.argpartition(valuation.user_totals, -n)[-n:]
+    top = top[np.argsort(valuation.user_totals[top])[::-1]]
+    return [(int(valuation.user_ids[i]), float(valuation.user_totals[i])) for i in top]
@@ -1,51 +1,51 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.utils.timezone import now, timedelta
+from django.utils.timezone import now
 from decimal import Decimal
-from .forms import DepositForm, WithdrawForm, TransferForm, UserRegisterForm, CustomLoginForm, OTPForm
+from .forms import DepositForm, WithdrawForm, TransferForm, UserRegisterForm, CustomLoginForm, OTPForm, TransactionSearchForm
 from .models import Wallet, Transaction, Ledger, FraudLog, CustomUser, LoginHistory
-from .utils import get_conversion_rate
-from django.core.mail import send_mail
+from .utils import get_conversion_rate, request_wallets
+from .emails import transaction_email
+from . import bulk, concurrency, events, fraud, limits, otp, outbox, panels, posting, search, summary, valuation
+from .pagination import keyset_page
+from . import statements
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_POST
+from django.utils.safestring import mark_safe
 from django.contrib.auth import login, authenticate
+from django.contrib.auth.views import redirect_to_login
 from django.db import transaction as db_transaction
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Q, Sum
-import pyotp
-import qrcode
-import io
-import base64
-from django.conf import settings
-from django_ratelimit.decorators import ratelimit
-from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+import asyncio
+import json
+from functools import wraps
+from django.core.cache import cache
+from .throttle import ratelimit
 
 
 TRANSACTION_THRESHOLD = 100000
   
 
 
-@ratelimit(key='ip', method='GET', rate='5/m', block=True)
+@ratelimit('dashboard')
 @login_required
 def dashboard_view(request):
-    if getattr(request, 'limited', False):
-        return render(request, 'rate.html', status=429)
-    wallets = Wallet.objects.filter(user=request.user)
-    transactions = Transaction.objects.filter(wallet__user=request.user).order_by('-created_at')[:10]
-    fraud_logs = FraudLog.objects.filter(user=request.user).order_by('-flagged_at')  # 👈 Add this
+    # Pre-rendered per user and invalidated on change (see wallet.panels), so most hits run no panel queries
+    return render(request, 'dashboard.html', _dashboard_context(panels.render_panels(request.user)))
 
-    return render(request, 'dashboard.html', {
-        'wallets': wallets,
-        'transactions': transactions,
-        'fraud_logs': fraud_logs,  
-    })
 
-@ratelimit(key='user', method='GET', rate='5/m', block=True)
+def _dashboard_context(rendered):
+    return {'panels': {name: mark_safe(html) for name, html in rendered.items()}}
+
+@ratelimit('deposit')
 @login_required
 def deposit_view(request):
-    if getattr(request, 'limited', False):
-        return render(request, 'rate.html', status=429)
     if request.method == "POST":
-        form = DepositForm(request.POST, user=request.user)
+        form = DepositForm(request.POST, user=request.user, wallets=request_wallets(request))
         if form.is_valid():
             tx = form.save(commit=False)
             tx.tx_type = "DEPOSIT"
@@ -71,32 +71,18 @@ def deposit_view(request):
 
             return redirect("dashboard_view")
     else:
-        form = DepositForm(user=request.user)
+        form = DepositForm(user=request.user, wallets=request_wallets(request))
     return render(request, 'deposit.html', {'form': form})
 
-@ratelimit(key='user', method='GET', rate='5/m', block=True)
-def check_large_withdrawals(wallet):
-    last_24_hours = now() - timedelta(hours=24)
-    total_withdrawn = Transaction.objects.filter(
-        wallet=wallet,
-        tx_type="WITHDRAW",
-        status="APPROVED",
-        processed_at__gte=last_24_hours
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    if total_withdrawn > 500000:
-        FraudLog.objects.create(
-            user=wallet.user,
-            reason="Withdrawals exceeded ₹5L in 24 hours"
-        )
+def check_large_withdrawals(wallet, amount=0):
+    # Reads at most 24 hourly buckets; the fraud engine logs the breach against the transaction
+    return limits.withdrawn_within(wallet.pk, 24) + amount > fraud.DAILY_WITHDRAWAL_LIMIT
 
-@ratelimit(key='user', method='GET', rate='5/m', block=True)
+@ratelimit('withdraw')
 @login_required
 def withdraw_view(request):
-    if getattr(request, 'limited', False):
-        return render(request, 'rate.html', status=429)
     if request.method == 'POST':
-        form = WithdrawForm(request.POST, user=request.user)
+        form = WithdrawForm(request.POST, user=request.user, wallets=request_wallets(request))
         if form.is_valid():
             tx = form.save(commit=False)
             tx.tx_type = "WITHDRAW"
@@ -105,6 +91,9 @@ def withdraw_view(request):
                 messages.error(request, "Insufficient balance for withdrawal.")
                 return redirect('withdraw_view')
 
+            if check_large_withdrawals(tx.wallet, tx.amount):
+                messages.warning(request, "This withdrawal takes you over ₹5L in 24 hours and will be reviewed.")
+
             try:
                 with db_transaction.atomic():
                     if tx.amount > TRANSACTION_THRESHOLD:
@@ -123,19 +112,17 @@ def withdraw_view(request):
 
             return redirect('dashboard_view')
     else:
-        form = WithdrawForm(user=request.user)
+        form = WithdrawForm(user=request.user, wallets=request_wallets(request))
 
     return render(request, 'withdraw.html', {'form': form})
 
 
 
-@ratelimit(key='user', method='GET', rate='5/m', block=True)
+@ratelimit('transfer')
 @login_required
 def transfer_view(request):
-    if getattr(request, 'limited', False):
-        return render(request, 'rate.html', status=429)
     if request.method == 'POST':
-        form = TransferForm(request.POST, user=request.user)
+        form = TransferForm(request.POST, user=request.user, wallets=request_wallets(request))
         if form.is_valid():
             tx = form.save(commit=False)
             amount = tx.amount
@@ -170,18 +157,11 @@ def transfer_view(request):
                         tx.save()
                         messages.info(request, "Transfer submitted for approval.")
                     else:
-                        # Approved directly → update balances immediately
+                        # Approved directly → the post_save signal posts both legs
                         tx.status = "APPROVED"
                         tx.processed_at = now()
                         tx.save()
 
-                        # 💸 Update balances
-                        tx.wallet.balance -= tx.amount
-                        tx.wallet.save()
-
-                        tx.target_wallet.balance += tx.converted_amount
-                        tx.target_wallet.save()
-
                         messages.success(request, "Transfer successful.")
             except Exception as e:
                 messages.error(request, f"Transfer failed: {str(e)}")
@@ -189,30 +169,70 @@ def transfer_view(request):
 
             return redirect('dashboard_view')
     else:
-        form = TransferForm(user=request.user)
+        form = TransferForm(user=request.user, wallets=request_wallets(request))
 
     return render(request, 'transfer.html', {'form': form})
 
     
-@ratelimit(key='user', method='GET', rate='5/m', block=True)
+@ratelimit('ledger')
 @login_required
 def ledger_view(request):
-    if getattr(request, 'limited', False):
-        return render(request, 'rate.html', status=429)
-    wallets = Wallet.objects.filter(user=request.user)
+    return render(request, 'ledger.html', _ledger_context(request, concurrency.run_all(_ledger_groups(request))))
+
+
+def _ledger_groups(request):
+    # The wallets and the ledger page don't depend on each other; ownership is checked afterwards
+    groups = {'wallets': lambda: request_wallets(request)}
+    selected_wallet_id = request.GET.get('wallet')
+    if selected_wallet_id:
+        if not selected_wallet_id.isdigit():
+            raise Http404("No such wallet.")
+        groups['page'] = lambda: keyset_page(
+            Ledger.objects.filter(wallet_id=selected_wallet_id, wallet__user=request.user).select_related('transaction'),
+            'timestamp',
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    return groups
+
+
+def _ledger_context(request, results):
+    wallets = results['wallets']
     selected_wallet_id = request.GET.get('wallet')
     selected_wallet = None
-    ledger_entries = []
+    page = results.get('page')
 
     if selected_wallet_id:
-        selected_wallet = get_object_or_404(Wallet, id=selected_wallet_id, user=request.user)
-        ledger_entries = Ledger.objects.filter(wallet=selected_wallet).order_by('-timestamp')
+        selected_wallet = next((wallet for wallet in wallets if str(wallet.pk) == selected_wallet_id), None)
+        if selected_wallet is None:
+            raise Http404("No such wallet.")
 
-    return render(request, 'ledger.html', {
+    return {
         'wallets': wallets,
         'selected_wallet': selected_wallet,
-        'ledger_entries': ledger_entries,
-    })
+        'ledger_entries': page.object_list if page else [],
+        'page': page,
+    }
+
+@ratelimit('statement_export')
+@login_required
+def statement_export_view(request):
+    wallet_id = request.GET.get('wallet', '')
+    if not wallet_id.isdigit():
+        raise Http404("No such wallet.")
+    wallet = get_object_or_404(Wallet, id=wallet_id, user=request.user)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in statements.FORMATS:
+        return HttpResponseBadRequest("Unsupported format.")
+    try:
+        start, end = statements.parse_range(request.GET.get('from'), request.GET.get('to'))
+    except ValueError:
+        return HttpResponseBadRequest("Dates must be valid YYYY-MM-DD.")
+
+    rows = statements.statement_rows(wallet, start, end)
+    response = StreamingHttpResponse(statements.render(rows, fmt), content_type=statements.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="statement-{wallet.account_number}.{fmt}"'
+    return response
 
 # --- Manager Views ---
 
@@ -222,35 +242,77 @@ def is_manager(user):
 @login_required
 @user_passes_test(is_manager)
 def pending_transactions(request):
-    txs = Transaction.objects.filter(status='PENDING').order_by('-created_at')
-    return render(request, 'manager/pending_transactions.html', {'transactions': txs})
-
-def send_transaction_email(tx, wallet, approved=True):
-    status_text = "Approved" if approved else "Rejected"
-    emoji = "✅" if approved else "❌"
-
-    subject = f"{emoji} Transaction {status_text}"
-    message = (
-        f"Dear {wallet.user.username},\n\n"
-        f"Your {tx.tx_type.lower()} transaction has been {status_text.lower()}.\n\n"
-        f"📌 Transaction ID: {tx.id}\n"
-        f"💰 Amount: ₹{tx.amount}\n"
-        f"💳 Wallet: {wallet.account_number}\n"
-        f"📅 {status_text} At: {tx.processed_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
-        f"🔐 Status: {tx.status}\n\n"
-        f"Thank you for using WalletApp.\n\n"
-        f"- WalletApp Team"
+    page = keyset_page(
+        Transaction.objects.filter(status='PENDING').select_related('wallet__user', 'wallet__currency', 'target_wallet__currency'),
+        'created_at',
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
     )
+    return render(request, 'manager/pending_transactions.html', {'transactions': page.object_list, 'page': page})
+
+
+@login_required
+@user_passes_test(is_manager)
+@require_POST
+def bulk_review_transactions(request):
+    action = request.POST.get('action')
+    if action not in ('approve', 'reject'):
+        return HttpResponseBadRequest("Unknown action.")
+    try:
+        tx_ids = [int(tx_id) for tx_id in request.POST.getlist('tx_ids')]
+    except ValueError:
+        return HttpResponseBadRequest("Invalid transaction id.")
+
+    result = (bulk.approve if action == 'approve' else bulk.reject)(tx_ids, request.user)
+    if result.processed:
+        messages.success(request, f"{len(result.processed)} transaction(s) {action}d.")
+    for reason in sorted(set(result.failed.values())):
+        messages.error(request, f"Left pending: {reason}")
+    skipped = len(set(tx_ids)) - len(result.processed) - len(result.failed)
+    if skipped:
+        messages.info(request, f"{skipped} transaction(s) were already processed.")
+    return redirect('pending_transactions')
+
+SSE_HEARTBEAT_SECONDS = 15
+
 
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email='noreply@walletapp.com',
-        recipient_list=[wallet.user.email],
-        fail_silently=True
+async def pending_events(request):
+    """
+    Server-Sent Events stream of pending-queue changes for managers.
+
+    Events come from the in-process broadcaster, so an open page costs the
+    database nothing after the initial session lookup. Needs the ASGI server.
+    """
+    if not await sync_to_async(is_manager)(request.user):
+        return HttpResponseForbidden()
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("Live updates need the ASGI server.", status=501)
+    return StreamingHttpResponse(
+        _event_stream(),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
     )
 
 
+async def _event_stream():
+    queue = events.broadcaster.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"  # stops proxies closing an idle connection
+                continue
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        events.broadcaster.unsubscribe(queue)
+
+
+def send_transaction_email(tx, wallet, approved=True):
+    outbox.enqueue(*transaction_email(tx, wallet, approved), from_email='noreply@walletapp.com')
+
+
 @login_required
 @user_passes_test(is_manager)
 @db_transaction.atomic
@@ -262,66 +324,15 @@ def approve_transaction(request, tx_id):
         tx.approved_by = request.user
         tx.processed_at = now()
 
-        wallet = Wallet.objects.select_for_update().get(pk=tx.wallet.pk)
-
-        if tx.tx_type == 'DEPOSIT':
-            wallet.balance += tx.amount
-            wallet.unfreeze()
-            wallet.save()
-            Ledger.objects.create(
-                transaction=tx,
-                wallet=wallet,
-                entry_type='credit',
-                amount=tx.amount,
-                balance_after=wallet.balance
-            )
-
-        elif tx.tx_type == 'WITHDRAW':
-            wallet.balance -= tx.amount
-            wallet.unfreeze(tx.amount)
-            wallet.save()
-            Ledger.objects.create(
-                transaction=tx,
-                wallet=wallet,
-                entry_type='debit',
-                amount=tx.amount,
-                balance_after=wallet.balance
-            )
-
-            if tx.amount > 500000:
-                FraudLog.objects.create(
-                    user=wallet.user,
-                    transaction=tx,
-                    reason="Withdraw above ₹5L"
-                )
-
-        elif tx.tx_type == 'TRANSFER':
-            target_wallet = Wallet.objects.select_for_update().get(pk=tx.target_wallet.pk)
-
-            wallet.balance -= tx.amount
-            wallet.unfreeze()
-            wallet.save()
-
-            target_wallet.balance += tx.converted_amount
-            target_wallet.unfreeze()
-            target_wallet.save()
-
-            Ledger.objects.create(
-                transaction=tx,
-                wallet=wallet,
-                entry_type='debit',
-                amount=tx.amount,
-                balance_after=wallet.balance
-            )
-            Ledger.objects.create(
-                transaction=tx,
-                wallet=target_wallet,
-                entry_type='credit',
-                amount=tx.converted_amount,
-                balance_after=target_wallet.balance
-            )
-
-        tx.save()
+        # Moves the balances, releases the holds and writes the ledger rows
+        if not posting.post(tx, release_hold=True):
+            messages.info(request, "Transaction was already processed.")
+            return redirect('pending_transactions')
+        tx.save()  # post_save runs the fraud rules, including withdrawals above ₹5L
+        summary.bump('pending', count=-1)
+        events.transactions_processed('APPROVED', [tx.pk])
+
+        wallet = tx.wallet
 
     send_transaction_email(tx, wallet, approved=True)
     messages.success(request, "Transaction approved.")
@@ -342,8 +353,9 @@ def reject_transaction(request, tx_id):
     if tx.tx_type == 'TRANSFER' and tx.target_wallet:
         tx.target_wallet.unfreeze(tx.converted_amount)
 
-    tx.wallet.save()
     tx.save()
+    summary.bump('pending', count=-1)
+    events.transactions_processed('REJECTED', [tx.pk])
 
     send_transaction_email(tx, tx.wallet, approved=False)
     messages.info(request, "Transaction rejected.")
@@ -351,47 +363,106 @@ def reject_transaction(request, tx_id):
 
 
 
+# Sub-tables of the manager dashboard: (queryset, keyset ordering field), one loaded per request
+DASHBOARD_SECTIONS = {
+    'pending': (lambda: Transaction.objects.filter(status='PENDING').select_related('wallet__user', 'wallet__currency'), 'created_at'),
+    'fraud': (lambda: FraudLog.objects.select_related('user', 'transaction'), 'id'),
+    'wallets': (lambda: Wallet.objects.select_related('user', 'currency'), 'id'),
+    'customers': (lambda: CustomUser.objects.filter(role='user'), 'id'),
+}
+AUM_CACHE_SECONDS = 60
+
+
+def assets_under_management():
+    """Valuation of all wallets, recomputed at most once a minute."""
+    def compute():
+        aum = valuation.value_portfolio()
+        top = valuation.top_users(aum)
+        names = dict(CustomUser.objects.filter(pk__in=[user_id for user_id, _ in top]).values_list('id', 'username'))
+        return {
+            'base': aum.base,
+            'total': aum.total,
+            'by_currency': aum.by_currency,
+            'top_holders': [(names.get(user_id), value) for user_id, value in top],
+        }
+    return cache.get_or_set('dashboard:aum', compute, AUM_CACHE_SECONDS)
+
+
+@ratelimit('manager_dashboard')
 @login_required
 @user_passes_test(is_manager)
 def manager_dashboard(request):
-    customers = CustomUser.objects.filter(role='user')
-    wallets = Wallet.objects.all()
-    pending_txs = Transaction.objects.filter(status='PENDING')
-    fraud_logs = FraudLog.objects.all().order_by('-flagged_at')
+    section = request.GET.get('section', 'pending')
+    if section not in DASHBOARD_SECTIONS:
+        return HttpResponseBadRequest("Unknown section.")
+    results = concurrency.run_all(_manager_dashboard_groups(request, section))
+    return render(request, 'manager/dashboard.html', _manager_dashboard_context(section, results))
 
-    return render(request, 'manager/dashboard.html', {
-        'customers': customers,
-        'wallets': wallets,
-        'pending_txs': pending_txs,
-        'fraud_logs': fraud_logs,
-    })
+
+def _manager_dashboard_groups(request, section):
+    queryset, field = DASHBOARD_SECTIONS[section]
+    return {
+        'page': lambda: keyset_page(queryset(), field, after=request.GET.get('after'), before=request.GET.get('before')),
+        # Counts and totals come from the summary read-model, not from COUNT/SUM over the raw tables
+        'totals': summary.snapshot,
+        'aum': assets_under_management,
+    }
+
+
+def _manager_dashboard_context(section, results):
+    totals = results['totals']
+    return {
+        'section': section,
+        'sections': [(name, totals[name]) for name in DASHBOARD_SECTIONS],
+        'rows': results['page'].object_list,
+        'page': results['page'],
+        'totals': totals,
+        'aum': results['aum'],
+    }
 
 
 
 
 @staff_member_required  
 def manager_transaction_history(request):
-    wallets = Wallet.objects.all()
-    selected_wallet_id = request.GET.get('wallet')
-    transactions = Transaction.objects.all().select_related('wallet', 'target_wallet')
+    form = TransactionSearchForm(request.GET or None)
+    transactions = Transaction.objects.select_related('wallet__user', 'wallet__currency', 'target_wallet__user')
 
-    if selected_wallet_id:
+    filters = form.cleaned_data if form.is_valid() else {}
+    selected_wallet_id = request.GET.get('wallet')
+    if selected_wallet_id and selected_wallet_id.isdigit():
         transactions = transactions.filter(Q(wallet_id=selected_wallet_id) | Q(target_wallet_id=selected_wallet_id))
+        filters = {**filters, 'wallet': selected_wallet_id}
+    transactions = search.filter_transactions(transactions, filters)
+
+    page = keyset_page(
+        transactions,
+        'created_at',
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    count, more = search.count_matching(transactions, filters)
+
+    # Pagination links carry the filters but not the current cursor
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
 
     return render(request, 'manager/transaction_history.html', {
-        'transactions': transactions.order_by('-created_at'),
-        'wallets': wallets,
-        'selected_wallet_id': selected_wallet_id
+        'transactions': page.object_list,
+        'page': page,
+        'form': form,
+        'count': count,
+        'more': more,
+        'filter_query': query.urlencode(),
     })
 
 
 
 
 # Registration and Login with OTP
-@ratelimit(key='ip', method='GET', rate='5/m', block=True)
+@ratelimit('register')
 def register_view(request):
-    if getattr(request, 'limited', False):
-        return render(request, 'rate.html', status=429)
     if request.method == "POST":
         form = UserRegisterForm(request.POST)
         if form.is_valid():
@@ -420,17 +491,11 @@ def verify_otp(request):
                 messages.error(request, "Invalid OTP.")
     else:
         form = OTPForm()
-    uri = user.get_totp_uri()
-    img = qrcode.make(uri)
-    buffer = io.BytesIO()
-    img.save(buffer, 'PNG')
-    qr_data = base64.b64encode(buffer.getvalue()).decode()
-    return render(request, 'register/verify_otp.html', {'form': form, 'qr_data': qr_data})
-
-@ratelimit(key='ip', method='GET', rate='5/m', block=True)
+    # Rendered once per secret and cached, so a refresh costs no image encoding
+    return render(request, 'register/verify_otp.html', {'form': form, 'qr_svg': mark_safe(otp.qr_svg(user))})
+
+@ratelimit('login')
 def custom_login_view(request):
-    if getattr(request, 'limited', False):
-            return render(request, 'rate.html', status=429)
     if request.method == 'POST':
         form = CustomLoginForm(request, data=request.POST)
         if form.is_valid():
@@ -444,17 +509,73 @@ def custom_login_view(request):
     return render(request, 'register/login.html', {'form': form})
 
 
+@login_required
+@user_passes_test(is_manager)
+def manager_login_history(request):
+    results = concurrency.run_all(_login_history_groups(request))
+    return render(request, 'manager/login_history.html', _login_history_context(results))
+
 
+def _login_history_groups(request):
+    return {
+        'page': lambda: keyset_page(
+            LoginHistory.objects.select_related('user'),
+            'login_time',
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        ),
+        'active': LoginHistory.objects.filter(logout_time__isnull=True).count,
+    }
 
-from django.contrib.auth.decorators import login_required, user_passes_test
-from .models import LoginHistory
 
-@login_required
-def manager_login_history(request):
-    logins = LoginHistory.objects.select_related('user').order_by('-login_time')
-    return render(request, 'manager/login_history.html', {'logins': logins})
+def _login_history_context(results):
+    return {'logins': results['page'].object_list, 'page': results['page'], 'active': results['active']}
+
+# --- Async read views (routed instead of the sync ones under ASGI, see settings.ASYNC_READ_VIEWS) ---
+# They load the same query groups as the sync views above, but concurrently.
+
+def async_user_passes_test(test_func):
+    """user_passes_test for async views; Django 4.2's auth decorators only wrap sync views."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # request.user is loaded lazily from the session, which is a sync DB read
+            if await sync_to_async(test_func)(request.user):
+                return await view(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path())
+        return wrapper
+    return decorator
+
+
+async_login_required = async_user_passes_test(lambda user: user.is_authenticated)
+
+
+@ratelimit('dashboard')
+@async_login_required
+async def dashboard_view_async(request):
+    rendered = await panels.arender_panels(request.user)
+    return await sync_to_async(render)(request, 'dashboard.html', _dashboard_context(rendered))
+
+
+@ratelimit('ledger')
+@async_login_required
+async def ledger_view_async(request):
+    results = await concurrency.gather(_ledger_groups(request))
+    return await sync_to_async(render)(request, 'ledger.html', _ledger_context(request, results))
+
+
+@ratelimit('manager_dashboard')
+@async_user_passes_test(is_manager)
+async def manager_dashboard_async(request):
+    section = request.GET.get('section', 'pending')
+    if section not in DASHBOARD_SECTIONS:
+        return HttpResponseBadRequest("Unknown section.")
+    results = await concurrency.gather(_manager_dashboard_groups(request, section))
+    return await sync_to_async(render)(request, 'manager/dashboard.html', _manager_dashboard_context(section, results))
+
 
-from django.shortcuts import render
+@async_user_passes_test(is_manager)
+async def manager_login_history_async(request):
+    results = await concurrency.gather(_login_history_groups(request))
+    return await sync_to_async(render)(request, 'manager/login_history.html', _login_history_context(results))
 
-def rate_limited_view(request, exception):
-    return render(request, 'rate.html', status=429)